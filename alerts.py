@@ -0,0 +1,211 @@
+import os
+import time
+import atexit
+import asyncio
+import threading
+from contextlib import contextmanager
+from telemetry import count
+
+TELEGRAM_TOKEN     = os.getenv("TELEGRAM_BOT_TOKEN")
+TELEGRAM_CHAT_IDS  = [c.strip() for c in os.getenv("TELEGRAM_CHAT_ID", "").split(",")
+                      if c.strip()]
+TELEGRAM_API_URL   = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org/bot")
+TELEGRAM_RATE      = float(os.getenv("TELEGRAM_RATE", "30"))        # msgs/s, whole bot
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))    # msgs/s, per chat
+ALERT_RETRIES      = int(os.getenv("ALERT_RETRIES", "4"))
+ALERT_BACKOFF      = float(os.getenv("ALERT_BACKOFF", "1"))         # seconds, doubles
+MAX_MESSAGE_LEN    = 4096
+
+_bot = None
+
+def get_bot():
+    """Bot for TELEGRAM_API_URL (point it at a fake server in tests)."""
+    global _bot
+    if _bot is None:
+        from telegram import Bot
+        from telegram.request import HTTPXRequest
+        request = HTTPXRequest(connect_timeout=30, read_timeout=30,
+                               write_timeout=30, pool_timeout=30)
+        _bot = Bot(token=TELEGRAM_TOKEN, request=request, base_url=TELEGRAM_API_URL)
+    return _bot
+
+async def _bot_send(chat_id: str, text: str):
+    await get_bot().send_message(chat_id=chat_id, text=text, parse_mode="HTML")
+
+class TokenBucket:
+    """`rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate     = rate
+        self.capacity = capacity or max(rate, 1)
+        self.tokens   = self.capacity
+        self.stamp    = time.monotonic()
+
+    async def take(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp  = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+def coalesce(messages: list[str], limit: int = MAX_MESSAGE_LEN) -> list[str]:
+    """Joins messages with blank lines into as few ≤ limit chunks as possible."""
+    chunks = []
+    for msg in messages:
+        if chunks and len(chunks[-1]) + 2 + len(msg) <= limit:
+            chunks[-1] += "\n\n" + msg
+        else:
+            chunks.append(msg)
+    return chunks
+
+class AlertDispatcher:
+    """
+    One event loop on a background thread that owns the Telegram
+    client. send() only enqueues; each message fans out to every
+    chat concurrently (in order within a chat), paced by a global
+    and a per-chat token bucket, with exponential-backoff retries on
+    TimedOut / NetworkError and RetryAfter honoured. Inside batch() messages are held and
+    delivered as one coalesced message per chat.
+    `sender(chat_id, text)` is the coroutine that does the delivery.
+    """
+
+    def __init__(self, chat_ids: list[str] = TELEGRAM_CHAT_IDS,
+                 rate: float = TELEGRAM_RATE, chat_rate: float = TELEGRAM_CHAT_RATE,
+                 retries: int = ALERT_RETRIES, backoff: float = ALERT_BACKOFF,
+                 sender=_bot_send):
+        self.chat_ids  = list(chat_ids)
+        self.rate      = rate
+        self.chat_rate = chat_rate
+        self.retries   = retries
+        self.backoff   = backoff
+        self.sender    = sender
+        self.sent      = 0
+        self.failed: list[tuple[str, str]] = []
+        self._held     = None
+        self._pending  = 0
+        self._idle     = threading.Condition()
+        self._loop     = asyncio.new_event_loop()
+        self._thread   = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        self._queue    = asyncio.run_coroutine_threadsafe(self._setup(), self._loop).result()
+
+    async def _setup(self) -> asyncio.Queue:
+        self._global  = TokenBucket(self.rate)
+        self._chats   = {chat: asyncio.Queue() for chat in self.chat_ids}
+        self._workers = [asyncio.ensure_future(self._chat_worker(chat, queue))
+                         for chat, queue in self._chats.items()]
+        queue = asyncio.Queue()
+        self._workers.append(asyncio.ensure_future(self._run(queue)))
+        return queue
+
+    # ── Producer side (any thread) ──────────────────
+    def send(self, msg: str):
+        if self._held is not None:
+            self._held.append(msg)
+            return
+        with self._idle:
+            self._pending += len(self.chat_ids)
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, msg)
+
+    @contextmanager
+    def batch(self):
+        """Holds messages sent inside the block and coalesces them."""
+        outer, self._held = self._held, []
+        try:
+            yield self
+        finally:
+            held, self._held = self._held, outer
+            for msg in coalesce(held):
+                self.send(msg)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Blocks until every queued message is delivered or given up."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self, timeout: float | None = 60):
+        self.flush(timeout)
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+    # ── Event loop side ─────────────────────────────
+    async def _shutdown(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+    async def _run(self, queue: asyncio.Queue):
+        while True:
+            msg = await queue.get()
+            for chat_queue in self._chats.values():
+                chat_queue.put_nowait(msg)
+
+    async def _chat_worker(self, chat_id: str, queue: asyncio.Queue):
+        """Delivers to one chat in order; chats run concurrently."""
+        bucket = TokenBucket(self.chat_rate)
+        while True:
+            msg = await queue.get()
+            try:
+                await self._deliver(chat_id, msg, bucket)
+            finally:
+                with self._idle:
+                    self._pending -= 1
+                    self._idle.notify_all()
+
+    async def _deliver(self, chat_id: str, msg: str, bucket: TokenBucket):
+        from telegram.error import TimedOut, NetworkError, RetryAfter
+
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            await bucket.take()
+            await self._global.take()
+            try:
+                count("http.telegram")
+                await self.sender(chat_id, msg)
+                self.sent += 1
+                return
+            except RetryAfter as e:
+                wait = e.retry_after
+                wait = wait.total_seconds() if hasattr(wait, "total_seconds") else wait
+                print(f"[WARN] Telegram flood limit on {chat_id}, retry in {wait}s")
+                await asyncio.sleep(wait)
+            except (TimedOut, NetworkError) as e:
+                print(f"[WARN] Telegram error on {chat_id} "
+                      f"(attempt {attempt + 1}/{self.retries + 1}): {e}")
+                if attempt < self.retries:
+                    await asyncio.sleep(delay)
+                    delay *= 2
+            except Exception as e:
+                print(f"[WARN] Telegram unexpected on {chat_id}: {e}")
+                break
+        self.failed.append((chat_id, msg))
+
+_dispatcher: AlertDispatcher | None = None
+_dispatcher_lock = threading.Lock()
+
+def dispatcher() -> AlertDispatcher:
+    """Process-wide dispatcher; drained at interpreter exit."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = AlertDispatcher()
+            atexit.register(_dispatcher.close)
+        return _dispatcher
+
+def send_alert(msg: str):
+    """Queues msg for every TELEGRAM_CHAT_ID; returns immediately."""
+    dispatcher().send(msg)
+
+def flush_alerts(timeout: float | None = None) -> bool:
+    """Waits for queued alerts; True at once if nothing was ever sent."""
+    return _dispatcher.flush(timeout) if _dispatcher is not None else True
+
+@contextmanager
+def alert_batch():
+    """Coalesces every send_alert inside the block into one message."""
+    with dispatcher().batch():
+        yield
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+# Twelve Data interval names → bar length
+INTERVALS = {
+    "1min":  pd.Timedelta(minutes=1),
+    "5min":  pd.Timedelta(minutes=5),
+    "15min": pd.Timedelta(minutes=15),
+    "30min": pd.Timedelta(minutes=30),
+    "45min": pd.Timedelta(minutes=45),
+    "1h":    pd.Timedelta(hours=1),
+    "2h":    pd.Timedelta(hours=2),
+    "4h":    pd.Timedelta(hours=4),
+    "1day":  pd.Timedelta(days=1),
+    "1week": pd.Timedelta(weeks=1),
+}
+
+def _stamps(times: pd.Series) -> np.ndarray:
+    """UTC datetime64[ns] values, sorted ascending or ValueError."""
+    times = pd.to_datetime(times)
+    if times.dt.tz is not None:
+        times = times.dt.tz_convert("UTC").dt.tz_localize(None)
+    values = times.to_numpy("datetime64[ns]")
+    if len(values) > 1 and (np.diff(values) < np.timedelta64(0)).any():
+        raise ValueError("bar timestamps must be sorted ascending")
+    return values
+
+def align_index(lower: pd.Series, higher: pd.Series,
+                lower_interval: str | None = None,
+                higher_interval: str | None = None) -> np.ndarray:
+    """
+    For every lower-timeframe bar, the position of its governing
+    higher-timeframe bar — the last one opened at or before it,
+    -1 where none had opened yet. That bar may still be forming, so
+    its close is only known later: without intervals this index
+    reads ahead of the lower bar.
+
+    Passing both intervals restricts the match to higher bars that had
+    fully closed by the time the lower bar closed — no look-ahead.
+    """
+    low_t  = _stamps(lower)
+    high_t = _stamps(higher)
+    if lower_interval and higher_interval:
+        low_t  = low_t  + INTERVALS[lower_interval].to_timedelta64()
+        high_t = high_t + INTERVALS[higher_interval].to_timedelta64()
+    return np.searchsorted(high_t, low_t, side="right") - 1
+
+def align_frames(frames: dict, base: str,
+                 closed_only: bool = True) -> dict[str, np.ndarray]:
+    """
+    Maps every bar of frames[base] onto each other frame in one
+    searchsorted pass per frame, e.g.
+        align_frames({"15min": m15, "4h": h4, "1day": d1}, "15min")
+    returns {"4h": idx, "1day": idx}, one entry per base bar.
+    Frames that are None are skipped. Frame names must be INTERVALS
+    keys: by default each base bar only sees higher bars that had
+    closed by its own close. closed_only=False matches the forming
+    bar as well: right for the live bar, whose forming higher bars
+    end at the current price, but look-ahead in a backtest.
+    """
+    times = frames[base]["datetime"]
+    return {
+        name: align_index(
+            times, df["datetime"],
+            base if closed_only else None,
+            name if closed_only else None,
+        )
+        for name, df in frames.items()
+        if name != base and df is not None
+    }
+
+def take(values: np.ndarray, idx: np.ndarray, fill=0) -> np.ndarray:
+    """values[idx] with `fill` where idx is -1 (no governing bar)."""
+    if not len(values):
+        return np.full(len(idx), fill, dtype=values.dtype)
+    return np.where(idx >= 0, values[np.maximum(idx, 0)], fill)
@@ -1,28 +1,32 @@
+import os
+import numpy as np
 import pandas as pd
 from datetime import datetime, timezone, timedelta
-from helpers import fetch_data, send_alert, rsi, bollinger_bands, atr
+from helpers import send_alert, flush_alerts, rsi, bollinger_bands, atr
+from strategy import (compute_signals, signal_context, Params, DEFAULT_PARAMS,
+                      RSI_PERIOD, BB_PERIOD, BB_STDDEV, ATR_PERIOD)
+from align import align_frames
+from swing import swing_stats, swing_distance_ok
+from store import CandleStore, fetch_cached_many
+from instruments import SYMBOLS, DEFAULT_SYMBOL, Instrument, get_instrument
+from telemetry import instrumented, span
+from montecarlo import monte_carlo
+from ledger import TradeLedger
 
 # ──────────────────────────────
 # CONFIG
 # ──────────────────────────────
-SYMBOLS        = ["XAU/USD"]
-INITIAL_EQUITY = 10_000
-RISK_PER_TRADE = 0.01
-LOOKBACK_DAYS  = 60
-WAT            = timezone(timedelta(hours=1))
-
-RSI_PERIOD     = 14
-BB_PERIOD      = 20
-BB_STDDEV      = 2
-ATR_PERIOD     = 14
-SL_MULTIPLIER  = 1.5
-TP_MULTIPLIER  = 2.5
-
-RSI_OVERSOLD   = 30
-RSI_OVERBOUGHT = 70
-RSI_BULL_ZONE  = 48
-RSI_BUY_MAX    = 58
-MIN_BODY_RATIO = 0.25
+INITIAL_EQUITY  = 10_000
+RISK_PER_TRADE  = 0.01
+LOOKBACK_DAYS   = int(os.getenv("LOOKBACK_DAYS", "60"))
+BACKTEST_MODE   = os.getenv("BACKTEST_MODE", "fixed")   # fixed | walkforward | stream | batch | portfolio
+BACKTEST_SOURCE = os.getenv("BACKTEST_SOURCE", "api")   # api | store (offline archive)
+TRADES_DIR      = os.getenv("BACKTEST_TRADES_DIR")      # per-symbol Parquet ledgers
+WAT             = timezone(timedelta(hours=1))
+
+# Indicator periods and signal thresholds come from strategy.py
+# (Params); only the backtest-specific settings live here.
+SWING_WINDOW   = 21     # away_from_swing looks at bars i-20 .. i
 
 # ──────────────────────────────
 # HELPERS
@@ -31,42 +35,41 @@ def body_ratio(candle) -> float:
     total = candle["high"] - candle["low"]
     return abs(candle["close"] - candle["open"]) / total if total else 0
 
-def strong_candle(candle, direction: str) -> bool:
-    if body_ratio(candle) < MIN_BODY_RATIO:
+def strong_candle(candle, direction: str,
+                  params: Params = DEFAULT_PARAMS) -> bool:
+    if body_ratio(candle) < params.min_body_ratio:
         return False
     return (candle["close"] > candle["open"]) if direction == "BUY" \
            else (candle["close"] < candle["open"])
 
-def clean_recent(df_1h: pd.DataFrame, i: int, lookback: int = 20) -> pd.DataFrame:
+def clean_recent(df_1h: pd.DataFrame, i: int,
+                 lookback: int = SWING_WINDOW - 1,
+                 instrument: Instrument | None = None) -> pd.DataFrame:
     """
-    Strict filtering for SWING window only.
-    Filters zero lows AND flat candles (< $1 range).
-    Does NOT affect indicator calculations.
+    Bars i-lookback .. i with the instrument's swing filters (zero
+    lows, flat candles; default DEFAULT_SYMBOL) applied, sliced afresh
+    for every bar. Kept independent of swing_stats so
+    check_signal_parity has a reference for the rolling swing columns.
     """
-    start  = max(0, i - lookback)
-    recent = df_1h.iloc[start: i + 1].copy()
-    recent = recent[
-        (recent["low"] > 100) &
-        (recent["high"] - recent["low"] >= 1.0)
-    ]
-    return recent
-
-def away_from_swing(df_1h: pd.DataFrame, i: int,
-                    direction: str, lookback: int = 20) -> bool:
-    recent = clean_recent(df_1h, i, lookback)
+    inst   = instrument or get_instrument(DEFAULT_SYMBOL)
+    recent = df_1h.iloc[max(0, i - lookback): i + 1]
+    return recent[(recent["low"] > inst.min_low) &
+                  (recent["high"] - recent["low"] >= inst.min_range)]
+
+def recent_swing(df_1h: pd.DataFrame, i: int,
+                 instrument: Instrument | None = None) -> tuple[float, float, float]:
+    """(swing_high, swing_low, swing_range) of clean_recent; NaNs when empty."""
+    recent = clean_recent(df_1h, i, instrument=instrument)
     if recent.empty:
-        return False
-
-    price      = df_1h.iloc[i]["close"]
-    atr_val    = df_1h.iloc[i]["atr"]
-    avg_range  = (recent["high"] - recent["low"]).mean()
-    avg_range  = max(avg_range, atr_val * 1.0)
-    swing_high = recent["high"].max()
-    swing_low  = recent["low"].min()
+        return np.nan, np.nan, np.nan
+    return (recent["high"].max(), recent["low"].min(),
+            (recent["high"] - recent["low"]).mean())
 
-    if direction == "SELL":
-        return price > swing_low + (avg_range * 2)
-    return price < swing_high - (avg_range * 2)
+def away_from_swing(df_1h: pd.DataFrame, i: int, direction: str,
+                    instrument: Instrument | None = None) -> bool:
+    bar = df_1h.iloc[i]
+    return bool(swing_distance_ok(bar["close"], bar["atr"],
+                                  recent_swing(df_1h, i, instrument), direction))
 
 def in_sl_zone(price: float, direction: str,
                sl_zones: list[dict], atr_val: float) -> bool:
@@ -78,6 +81,7 @@ def in_sl_zone(price: float, direction: str,
     return False
 
 def daily_bias(df_1d: pd.DataFrame, idx: int) -> str | None:
+    """idx: last closed daily bar from align.align_frames (-1 = none yet)."""
     if idx < 4:
         return None
     last1d = df_1d.iloc[idx]
@@ -90,11 +94,13 @@ def daily_bias(df_1d: pd.DataFrame, idx: int) -> str | None:
     if not price_above_mid and bulls <= 2: return "SELL"
     return None
 
-def weekly_bias_at(df_1w: pd.DataFrame, w_idx: int) -> str | None:
+def weekly_bias_at(df_1w: pd.DataFrame, w_idx: int,
+                   min_low: float = 100) -> str | None:
+    """w_idx: last closed weekly bar from align.align_frames (-1 = none yet)."""
     if df_1w is None or w_idx < 19:
         return None
     window = df_1w.iloc[: w_idx + 1].copy()
-    window = window[window["low"] > 100]
+    window = window[window["low"] > min_low]
     if len(window) < 20:
         return None
     window["ema20"] = window["close"].ewm(span=20, adjust=False).mean()
@@ -103,12 +109,15 @@ def weekly_bias_at(df_1w: pd.DataFrame, w_idx: int) -> str | None:
         return None
     return "BUY" if last["close"] > last["ema20"] else "SELL"
 
-def compute_indicators(df: pd.DataFrame) -> pd.DataFrame:
+def compute_indicators(df: pd.DataFrame,
+                       instrument: Instrument | None = None) -> pd.DataFrame:
     """
     Only filters zero/negative lows — preserves flat candles
     so RSI/BB/ATR continuity is not broken.
-    Flat candles are valid price action for indicator purposes.
+    Flat candles are valid price action for indicator purposes;
+    the instrument's filters apply to the swing columns only.
     """
+    inst = instrument or get_instrument(DEFAULT_SYMBOL)
     df = df.copy()
     df = df[df["low"] > 0].reset_index(drop=True)
     df["rsi"] = rsi(df["close"], RSI_PERIOD)
@@ -116,6 +125,8 @@ def compute_indicators(df: pd.DataFrame) -> pd.DataFrame:
         df["close"], BB_PERIOD, BB_STDDEV
     )
     df["atr"] = atr(df, ATR_PERIOD)
+    df[["swing_high", "swing_low", "swing_range"]] = \
+        swing_stats(df, SWING_WINDOW, inst.min_low, inst.min_range)
     return df
 
 # ──────────────────────────────
@@ -123,9 +134,12 @@ def compute_indicators(df: pd.DataFrame) -> pd.DataFrame:
 # ──────────────────────────────
 def scan_signal(df_1h: pd.DataFrame, i: int,
                 df_1d: pd.DataFrame, d_idx: int,
-                df_1w: pd.DataFrame = None, w_idx: int = 0,
-                debug: bool = False):
-    if i < 1:
+                df_1w: pd.DataFrame = None, w_idx: int = -1,
+                debug: bool = False, params: Params = DEFAULT_PARAMS,
+                instrument: Instrument | None = None):
+    p    = params
+    inst = instrument or get_instrument(DEFAULT_SYMBOL)
+    if i < 1 or d_idx < 0:
         return None, None, None, None
 
     last1h = df_1h.iloc[i]
@@ -142,7 +156,7 @@ def scan_signal(df_1h: pd.DataFrame, i: int,
     if bias is None:
         return None, None, None, None
 
-    w_bias = weekly_bias_at(df_1w, w_idx)
+    w_bias = weekly_bias_at(df_1w, w_idx, inst.min_low)
     if w_bias and w_bias != bias:
         return None, None, None, None
 
@@ -155,42 +169,42 @@ def scan_signal(df_1h: pd.DataFrame, i: int,
 
     if (bias == "BUY"
             and price > last1h["bb_mid"]
-            and RSI_BULL_ZONE < rsi_val < RSI_BUY_MAX
-            and strong_candle(last1h, "BUY")
-            and away_from_swing(df_1h, i, "BUY")):
+            and p.rsi_bull_zone < rsi_val < p.rsi_buy_max
+            and strong_candle(last1h, "BUY", p)
+            and away_from_swing(df_1h, i, "BUY", inst)):
         direction, sig_type = "BUY", "Trend"
 
     elif (bias == "SELL"
             and price < last1h["bb_mid"]
-            and RSI_OVERSOLD < rsi_val < RSI_BULL_ZONE
-            and strong_candle(last1h, "SELL")
-            and away_from_swing(df_1h, i, "SELL")):
+            and p.rsi_oversold < rsi_val < p.rsi_bull_zone
+            and strong_candle(last1h, "SELL", p)
+            and away_from_swing(df_1h, i, "SELL", inst)):
         direction, sig_type = "SELL", "Trend"
 
     elif (bias == "BUY"
             and price <= last1h["bb_lower"]
-            and rsi_val <= RSI_OVERSOLD
-            and strong_candle(last1h, "BUY")):
+            and rsi_val <= p.rsi_oversold
+            and strong_candle(last1h, "BUY", p)):
         direction, sig_type = "BUY", "Reversal"
 
     elif (bias == "SELL"
             and price >= last1h["bb_upper"]
-            and rsi_val >= RSI_OVERBOUGHT
-            and strong_candle(last1h, "SELL")):
+            and rsi_val >= p.rsi_overbought
+            and strong_candle(last1h, "SELL", p)):
         direction, sig_type = "SELL", "Reversal"
 
     if debug:
-        recent_dbg = clean_recent(df_1h, i)
-        avg_range  = (recent_dbg["high"] - recent_dbg["low"]).mean() \
-                     if not recent_dbg.empty else 0
+        swing      = recent_swing(df_1h, i, inst)
+        has_swing  = not pd.isna(swing[0])
+        avg_range  = swing[2] if has_swing else 0
         avg_range  = max(avg_range, atr_val * 1.0)
-        swing_high = recent_dbg["high"].max() if not recent_dbg.empty else 0
-        swing_low  = recent_dbg["low"].min()  if not recent_dbg.empty else 0
+        swing_high = swing[0] if has_swing else 0
+        swing_low  = swing[1] if has_swing else 0
         needed     = avg_range * 2
         bar_time   = df_1h.iloc[i]["datetime"] \
                      if "datetime" in df_1h.columns else i
         label      = direction if direction else "NO-SIGNAL"
-        swing_ok   = away_from_swing(df_1h, i, direction) \
+        swing_ok   = away_from_swing(df_1h, i, direction, inst) \
                      if direction else "-"
         print(
             f"[SIGNAL] {label} {sig_type or '-'} | "
@@ -206,111 +220,240 @@ def scan_signal(df_1h: pd.DataFrame, i: int,
     if not direction:
         return None, None, None, None
 
-    sl = round(price - atr_val * SL_MULTIPLIER, 2) if direction == "BUY" \
-         else round(price + atr_val * SL_MULTIPLIER, 2)
-    tp = round(price + atr_val * TP_MULTIPLIER, 2) if direction == "BUY" \
-         else round(price - atr_val * TP_MULTIPLIER, 2)
+    dp = inst.for_prices(df_1h["close"]).decimals
+    sl = round(price - atr_val * p.sl_multiplier, dp) if direction == "BUY" \
+         else round(price + atr_val * p.sl_multiplier, dp)
+    tp = round(price + atr_val * p.tp_multiplier, dp) if direction == "BUY" \
+         else round(price - atr_val * p.tp_multiplier, dp)
 
     return direction, sig_type, sl, tp
 
+def print_signal(df_1h: pd.DataFrame, sig: pd.DataFrame, i: int):
+    """Per-bar [SIGNAL] debug line built from a compute_signals row."""
+    price      = df_1h["close"].iat[i]
+    atr_val    = df_1h["atr"].iat[i]
+    direction  = sig["direction"].iat[i]
+    sig_type   = sig["signal_type"].iat[i]
+    has_swing  = not pd.isna(sig["swing_high"].iat[i])
+    avg_range  = sig["avg_range"].iat[i] if has_swing else atr_val * 1.0
+    swing_high = sig["swing_high"].iat[i] if has_swing else 0
+    swing_low  = sig["swing_low"].iat[i]  if has_swing else 0
+    bar_time   = df_1h["datetime"].iat[i] \
+                 if "datetime" in df_1h.columns else i
+    swing_ok   = bool(sig["away_buy" if direction == "BUY" else "away_sell"].iat[i]) \
+                 if direction else "-"
+    print(
+        f"[SIGNAL] {direction or 'NO-SIGNAL'} {sig_type or '-'} | "
+        f"Time: {bar_time} | "
+        f"Price: {price:.2f} | RSI: {df_1h['rsi'].iat[i]:.1f} | "
+        f"DailyBias: {sig['daily_bias'].iat[i]} | "
+        f"WeeklyBias: {sig['weekly_bias'].iat[i]} | "
+        f"SwingHigh: {swing_high:.2f} | SwingLow: {swing_low:.2f} | "
+        f"GapToHigh: {swing_high - price:.2f} | "
+        f"GapToLow: {price - swing_low:.2f} | "
+        f"Needed: {avg_range * 2:.2f} | SwingOK: {swing_ok}"
+    )
+
+def check_signal_parity(df_1h: pd.DataFrame, df_1d: pd.DataFrame,
+                        df_1w: pd.DataFrame = None,
+                        params: Params = DEFAULT_PARAMS,
+                        instrument: Instrument | None = None) -> int:
+    """
+    Replays scan_signal bar by bar and compares it with the
+    vectorized compute_signals output, both with the same instrument
+    settings (default DEFAULT_SYMBOL). The rolling swing columns are
+    also checked against recent_swing's per-bar window. Returns the
+    mismatch count.
+    """
+    inst    = (instrument or get_instrument(DEFAULT_SYMBOL)).for_prices(df_1h["close"])
+    aligned = align_frames({"1h": df_1h, "1day": df_1d, "1week": df_1w}, "1h")
+    sig     = compute_signals(df_1h, df_1d, df_1w, swing_window=SWING_WINDOW,
+                              aligned=aligned, instrument=inst, params=params)
+    w_idx   = aligned.get("1week")
+    atrs    = df_1h["atr"].to_numpy(float)
+
+    mismatches = 0
+    for i in range(len(df_1h)):
+        expected = scan_signal(df_1h, i, df_1d, aligned["1day"][i],
+                               df_1w, w_idx[i] if w_idx is not None else -1,
+                               params=params, instrument=inst)
+
+        direction = sig["direction"].iat[i]
+        got = (direction, sig["signal_type"].iat[i],
+               sig["sl"].iat[i] if direction else None,
+               sig["tp"].iat[i] if direction else None)
+        if got != expected:
+            mismatches += 1
+            print(f"[PARITY] bar {i}: per-bar {expected} vs vectorized {got}")
+            continue
+
+        swing_high, swing_low, swing_range = recent_swing(df_1h, i, inst)
+        ref = (swing_high, swing_low, np.maximum(swing_range, atrs[i]))
+        vec = (sig["swing_high"].iat[i], sig["swing_low"].iat[i], sig["avg_range"].iat[i])
+        if not np.allclose(ref, vec, rtol=1e-9, atol=0, equal_nan=True):
+            mismatches += 1
+            print(f"[PARITY] bar {i}: per-bar swing {ref} vs vectorized {vec}")
+    return mismatches
+
 # ──────────────────────────────
 # TRADE SIMULATOR
 # ──────────────────────────────
+def first_exit(high, low, start: int, direction: str,
+               sl: float, tp: float) -> tuple[int | None, bool]:
+    """
+    First bar >= start whose range touches SL or TP.
+    Searches in doubling chunks, so the cost follows the trade's
+    duration rather than the remaining history.
+    Returns (bar, hit_tp) — (None, False) while the trade is still open.
+    TP wins when both levels are touched on the same bar.
+    """
+    size = 32
+    while start < len(high):
+        end = min(start + size, len(high))
+        if direction == "BUY":
+            hit_sl, hit_tp = low[start:end] <= sl, high[start:end] >= tp
+        else:
+            hit_sl, hit_tp = high[start:end] >= sl, low[start:end] <= tp
+        hits = np.flatnonzero(hit_sl | hit_tp)
+        if hits.size:
+            return start + int(hits[0]), bool(hit_tp[hits[0]])
+        start, size = end, size * 2
+    return None, False
+
+def settle_trade(trade: dict, hit_tp: bool, exit_time, equity: float,
+                 risk_amt: float | None = None, decimals: int = 2) -> float:
+    """
+    Closes trade at its TP or SL and returns the new equity. The
+    position risks risk_amt, by default RISK_PER_TRADE of equity;
+    pnl_pips is rounded to the instrument's price decimals.
+    """
+    exit_price = trade["tp"] if hit_tp else trade["sl"]
+    pnl_pips   = (exit_price - trade["entry"]) \
+                 if trade["direction"] == "BUY" \
+                 else (trade["entry"] - exit_price)
+
+    risk_amt   = equity * RISK_PER_TRADE if risk_amt is None else risk_amt
+    sl_dist    = abs(trade["entry"] - trade["sl"])
+    lot_size   = risk_amt / sl_dist if sl_dist else 0
+    pnl_dollar = round(pnl_pips * lot_size, 2)
+    equity     = round(equity + pnl_dollar, 2)
+
+    trade["exit"]       = exit_price
+    trade["exit_time"]  = exit_time
+    trade["result"]     = "TP" if hit_tp else "SL"
+    trade["pnl_pips"]   = round(pnl_pips, decimals)
+    trade["pnl_dollar"] = pnl_dollar
+    trade["equity"]     = equity
+    return equity
+
 def simulate_trades(df_1h: pd.DataFrame,
                     df_1d: pd.DataFrame,
-                    df_1w: pd.DataFrame = None) -> list[dict]:
-    trades   = []
-    equity   = INITIAL_EQUITY
+                    df_1w: pd.DataFrame = None,
+                    debug: bool = False,
+                    instrument: Instrument | None = None,
+                    params: Params | None = None,
+                    aligned: dict | None = None,
+                    start: int | None = None,
+                    stop: int | None = None,
+                    initial_equity: float = INITIAL_EQUITY,
+                    run_out: bool = False,
+                    sl_zones: list | None = None,
+                    context: pd.DataFrame | None = None) -> TradeLedger:
+    """
+    Event-driven replay: jumps from one entry candidate to its exit
+    bar and resumes at the next candidate after it, so the Python
+    work scales with the number of signals instead of bars.
+    params / aligned are passed through to compute_signals.
+    start / stop limit trading to bars [start, stop) — indicators and
+    the signal_context still come from the whole frame, so a window
+    reuses the warm-up before it, and only the window's bars go
+    through the Params rules; a trade not closed by stop stays OPEN
+    unless run_out, which follows it to its exit past stop.
+    context is a precomputed signal_context of the whole frame, so
+    many windows / params share one (sweep, walk-forward).
+    sl_zones carries SL zones between consecutive windows: read on
+    entry and updated in place.
+    Trades are appended to a TradeLedger (iterates as trade dicts).
+    """
+    trades   = TradeLedger()
+    equity   = initial_equity
     trade    = None
-    sl_zones = []
-
-    df_1h = df_1h.copy()
-    df_1d = df_1d.copy()
-    df_1d["date"] = df_1d["datetime"].dt.date
-    df_1h["date"] = df_1h["datetime"].dt.date
-    d_dates = df_1d["date"].tolist()
-
-    df_1w_copy = None
-    w_dates    = []
-    if df_1w is not None:
-        df_1w_copy = df_1w.copy()
-        df_1w_copy["date"] = df_1w_copy["datetime"].dt.date
-        w_dates = df_1w_copy["date"].tolist()
-
-    def get_d_idx(date):
-        matches = [i for i, d in enumerate(d_dates) if d <= date]
-        return matches[-1] if matches else 0
-
-    def get_w_idx(date):
-        matches = [i for i, d in enumerate(w_dates) if d <= date]
-        return matches[-1] if matches else 0
-
-    for i in range(BB_PERIOD + 1, len(df_1h)):
-        bar   = df_1h.iloc[i]
-        d_idx = get_d_idx(bar["date"])
-        w_idx = get_w_idx(bar["date"]) if w_dates else 0
-
-        sl_zones = [z for z in sl_zones if i - z["bar"] <= 30]
-
-        if trade:
-            hit_sl = (trade["direction"] == "BUY"  and bar["low"]  <= trade["sl"]) or \
-                     (trade["direction"] == "SELL" and bar["high"] >= trade["sl"])
-            hit_tp = (trade["direction"] == "BUY"  and bar["high"] >= trade["tp"]) or \
-                     (trade["direction"] == "SELL" and bar["low"]  <= trade["tp"])
-
-            if hit_tp or hit_sl:
-                exit_price = trade["tp"] if hit_tp else trade["sl"]
-                pnl_pips   = (exit_price - trade["entry"]) \
-                             if trade["direction"] == "BUY" \
-                             else (trade["entry"] - exit_price)
-
-                risk_amt   = equity * RISK_PER_TRADE
-                sl_dist    = abs(trade["entry"] - trade["sl"])
-                lot_size   = risk_amt / sl_dist if sl_dist else 0
-                pnl_dollar = round(pnl_pips * lot_size, 2)
-                equity     = round(equity + pnl_dollar, 2)
-
-                trade["exit"]       = exit_price
-                trade["exit_time"]  = bar["datetime"]
-                trade["result"]     = "TP" if hit_tp else "SL"
-                trade["pnl_pips"]   = round(pnl_pips, 2)
-                trade["pnl_dollar"] = pnl_dollar
-                trade["equity"]     = equity
-
-                if trade["result"] == "SL":
-                    sl_zones.append({
-                        "direction": trade["direction"],
-                        "price":     exit_price,
-                        "bar":       i
-                    })
-                    print(f"[SL-ZONE] {trade['direction']} zone set at "
-                          f"{exit_price:.2f} bar {i}")
-
-                trades.append(trade)
-                trade = None
+    carried  = sl_zones
+    sl_zones = list(sl_zones or [])
+    inst     = (instrument or get_instrument(DEFAULT_SYMBOL)).for_prices(df_1h["close"])
+
+    stop  = len(df_1h) if stop is None else stop
+    end   = len(df_1h) if run_out else stop
+    high  = df_1h["high"].to_numpy(float)[:end]
+    low   = df_1h["low"].to_numpy(float)[:end]
+    close = df_1h["close"].to_numpy(float)
+    atrs  = df_1h["atr"].to_numpy(float)
+    first = max(BB_PERIOD + 1, start or 0)
+
+    # sig covers bars [first, stop) only: row i - first is bar i
+    if context is None:
+        context = signal_context(df_1h, df_1d, df_1w, SWING_WINDOW, aligned, inst)
+    rows   = slice(first, max(first, stop))
+    window = df_1h.iloc[rows]
+    sig    = compute_signals(window, df_1d, df_1w, instrument=inst, params=params,
+                             context=context.iloc[rows])
+
+    entries = first + np.flatnonzero(sig["direction"].notna().to_numpy())
+    ready   = first + np.flatnonzero(sig["ready"].to_numpy()) if debug else None
+
+    def print_flat(start: int, stop: int):
+        # [SIGNAL] lines for bars evaluated while flat, start <= bar < stop
+        if debug:
+            lo, hi = np.searchsorted(ready, [start, stop])
+            for j in ready[lo:hi]:
+                print_signal(window, sig, j - first)
+
+    flat_from = first
+    k = 0
+    while k < len(entries):
+        i = int(entries[k])
+        k += 1
+        print_flat(flat_from, i + 1)
+        flat_from = i + 1
+
+        direction = sig["direction"].iat[i - first]
+        sl_zones  = [z for z in sl_zones if i - z["bar"] <= 30]
+        if in_sl_zone(close[i], direction, sl_zones, atrs[i]):
+            print(f"[SL-ZONE BLOCK] {direction} at {close[i]:.2f} blocked")
             continue
 
-        direction, sig_type, sl, tp = scan_signal(
-            df_1h, i, df_1d, d_idx, df_1w_copy, w_idx, debug=True
-        )
+        trade = {
+            "symbol":     inst.symbol,
+            "direction":  direction,
+            "type":       sig["signal_type"].iat[i - first],
+            "entry":      close[i],
+            "sl":         sig["sl"].iat[i - first],
+            "tp":         sig["tp"].iat[i - first],
+            "entry_time": df_1h["datetime"].iat[i],
+        }
+
+        exit_bar, hit_tp = first_exit(high, low, i + 1, direction,
+                                      trade["sl"], trade["tp"])
+        if exit_bar is None:
+            break
+
+        equity = settle_trade(trade, hit_tp, df_1h["datetime"].iat[exit_bar], equity,
+                              decimals=inst.decimals)
+        if trade["result"] == "SL":
+            sl_zones.append({
+                "direction": trade["direction"],
+                "price":     trade["exit"],
+                "bar":       exit_bar
+            })
+            print(f"[SL-ZONE] {trade['direction']} zone set at "
+                  f"{trade['exit']:.2f} bar {exit_bar}")
 
-        if direction:
-            atr_val = df_1h.iloc[i]["atr"]
-            price   = df_1h.iloc[i]["close"]
-
-            if in_sl_zone(price, direction, sl_zones, atr_val):
-                print(f"[SL-ZONE BLOCK] {direction} at {price:.2f} blocked")
-                continue
+        trades.append(trade)
+        trade = None
 
-            trade = {
-                "symbol":     "XAU/USD",
-                "direction":  direction,
-                "type":       sig_type,
-                "entry":      bar["close"],
-                "sl":         sl,
-                "tp":         tp,
-                "entry_time": bar["datetime"],
-            }
+        # no re-entry on the exit bar itself
+        flat_from = exit_bar + 1
+        k = int(np.searchsorted(entries, exit_bar, side="right"))
 
     if trade:
         trade.update({
@@ -319,49 +462,31 @@ def simulate_trades(df_1h: pd.DataFrame,
             "pnl_dollar": None, "equity": equity
         })
         trades.append(trade)
+    else:
+        print_flat(flat_from, stop)
 
+    if carried is not None:
+        carried[:] = sl_zones
     return trades
 
 # ──────────────────────────────
 # STATS
 # ──────────────────────────────
-def calc_stats(trades: list[dict], initial_equity: float) -> dict:
-    closed = [t for t in trades if t["result"] != "OPEN"]
-    if not closed:
-        return {}
-
-    wins   = [t for t in closed if t["result"] == "TP"]
-    losses = [t for t in closed if t["result"] == "SL"]
-
-    total_pnl     = sum(t["pnl_dollar"] for t in closed)
-    win_rate      = len(wins) / len(closed) * 100
-    avg_win       = sum(t["pnl_dollar"] for t in wins)   / len(wins)   if wins   else 0
-    avg_loss      = sum(t["pnl_dollar"] for t in losses) / len(losses) if losses else 0
-    profit_factor = abs(
-        sum(t["pnl_dollar"] for t in wins) /
-        sum(t["pnl_dollar"] for t in losses)
-    ) if losses else float("inf")
-
-    equity_curve = [initial_equity] + [t["equity"] for t in closed]
-    peak, max_dd = equity_curve[0], 0.0
-    for e in equity_curve:
-        if e > peak: peak = e
-        dd = (peak - e) / peak * 100
-        if dd > max_dd: max_dd = dd
-
-    trend_trades    = [t for t in closed if t["type"] == "Trend"]
-    reversal_trades = [t for t in closed if t["type"] == "Reversal"]
-    trend_wr    = len([t for t in trend_trades    if t["result"] == "TP"]) \
-                  / len(trend_trades)    * 100 if trend_trades    else 0
-    reversal_wr = len([t for t in reversal_trades if t["result"] == "TP"]) \
-                  / len(reversal_trades) * 100 if reversal_trades else 0
-
-    final_equity = closed[-1]["equity"]
-
+def _summary(n_closed: int, n_wins: int, n_losses: int, win_sum, loss_sum,
+             total_pnl, max_dd, final_equity, n_trend: int, trend_wins: int,
+             n_reversal: int, reversal_wins: int, open_trades: int,
+             initial_equity: float) -> dict:
+    """The calc_stats dict from its running totals."""
+    win_rate      = n_wins / n_closed * 100
+    avg_win       = win_sum  / n_wins   if n_wins   else 0
+    avg_loss      = loss_sum / n_losses if n_losses else 0
+    profit_factor = abs(win_sum / loss_sum) if n_losses else float("inf")
+    trend_wr      = trend_wins    / n_trend    * 100 if n_trend    else 0
+    reversal_wr   = reversal_wins / n_reversal * 100 if n_reversal else 0
     return {
-        "total_trades":  len(closed),
-        "wins":          len(wins),
-        "losses":        len(losses),
+        "total_trades":  n_closed,
+        "wins":          n_wins,
+        "losses":        n_losses,
         "win_rate":      round(win_rate, 1),
         "total_pnl":     round(total_pnl, 2),
         "avg_win":       round(avg_win, 2),
@@ -372,18 +497,104 @@ def calc_stats(trades: list[dict], initial_equity: float) -> dict:
         "return_pct":    round((final_equity - initial_equity) / initial_equity * 100, 2),
         "trend_wr":      round(trend_wr, 1),
         "reversal_wr":   round(reversal_wr, 1),
-        "open_trades":   len([t for t in trades if t["result"] == "OPEN"]),
+        "open_trades":   open_trades,
     }
 
+def calc_stats(trades: TradeLedger | list[dict], initial_equity: float) -> dict:
+    """
+    Summary of the closed trades, computed from ledger columns in one
+    vectorized pass. Sums run through cumsum so they add in trade
+    order like the sequential sum() they replaced, and values stay
+    NumPy scalars so round() matches the list-of-dict results.
+    """
+    rows   = TradeLedger.from_records(trades).rows
+    closed = rows[rows["result"] != "OPEN"]
+    if not len(closed):
+        return {}
+
+    pnl     = closed["pnl_dollar"]
+    is_win  = closed["result"] == "TP"
+    is_loss = closed["result"] == "SL"
+    n_wins, n_losses = int(is_win.sum()), int(is_loss.sum())
+
+    equity_curve = np.concatenate([[initial_equity], closed["equity"]])
+    peak         = np.maximum.accumulate(equity_curve)
+
+    is_trend    = closed["type"] == "Trend"
+    is_reversal = closed["type"] == "Reversal"
+    return _summary(len(closed), n_wins, n_losses,
+                    np.cumsum(pnl[is_win])[-1]  if n_wins   else 0,
+                    np.cumsum(pnl[is_loss])[-1] if n_losses else 0,
+                    np.cumsum(pnl)[-1],
+                    ((peak - equity_curve) / peak * 100).max(),
+                    closed["equity"][-1],
+                    int(is_trend.sum()),    int((is_trend & is_win).sum()),
+                    int(is_reversal.sum()), int((is_reversal & is_win).sum()),
+                    len(rows) - len(closed), initial_equity)
+
+class RunningStats:
+    """
+    calc_stats one closed trade at a time, for runs that never hold
+    the whole trade list. Totals accumulate in trade order as NumPy
+    scalars, so summary() equals calc_stats over the same trades.
+    """
+
+    def __init__(self, initial_equity: float):
+        self.initial_equity = initial_equity
+        self.n_closed = self.n_wins = self.n_losses = 0
+        self.n_trend  = self.trend_wins = self.n_reversal = self.reversal_wins = 0
+        self.win_sum  = self.loss_sum = self.total_pnl = None
+        self.peak, self.max_dd = initial_equity, 0.0
+        self.final_equity = initial_equity
+        self.open_trades  = 0
+
+    @staticmethod
+    def _add(total, value):
+        return value if total is None else total + value
+
+    def add(self, trade: dict):
+        pnl    = np.float64(trade["pnl_dollar"])
+        equity = np.float64(trade["equity"])
+        is_win = trade["result"] == "TP"
+        self.n_closed  += 1
+        self.total_pnl  = self._add(self.total_pnl, pnl)
+        if is_win:
+            self.n_wins  += 1
+            self.win_sum  = self._add(self.win_sum, pnl)
+        elif trade["result"] == "SL":
+            self.n_losses += 1
+            self.loss_sum  = self._add(self.loss_sum, pnl)
+        if trade["type"] == "Trend":
+            self.n_trend    += 1
+            self.trend_wins += is_win
+        elif trade["type"] == "Reversal":
+            self.n_reversal    += 1
+            self.reversal_wins += is_win
+        self.peak         = max(self.peak, equity)
+        self.max_dd       = max(self.max_dd, (self.peak - equity) / self.peak * 100)
+        self.final_equity = equity
+
+    def summary(self) -> dict:
+        if not self.n_closed:
+            return {}
+        return _summary(self.n_closed, self.n_wins, self.n_losses,
+                        self.win_sum if self.n_wins else 0,
+                        self.loss_sum if self.n_losses else 0,
+                        self.total_pnl, self.max_dd, self.final_equity,
+                        self.n_trend, self.trend_wins, self.n_reversal,
+                        self.reversal_wins, self.open_trades, self.initial_equity)
+
 # ──────────────────────────────
 # REPORT
 # ──────────────────────────────
-def build_report(stats: dict, trades: list[dict], symbol: str) -> str:
-    now = datetime.now(WAT).strftime("%Y-%m-%d %H:%M")
+def build_report(stats: dict, trades: TradeLedger | list[dict], symbol: str,
+                 mc: dict | None = None, period: str | None = None) -> str:
+    now    = datetime.now(WAT).strftime("%Y-%m-%d %H:%M")
+    period = period or f"Last {LOOKBACK_DAYS} Days"
 
     if not stats:
         return (
-            f"📉 <b>{symbol} Backtest — {LOOKBACK_DAYS}d</b>\n"
+            f"📉 <b>{symbol} Backtest — {period}</b>\n"
             f"No closed trades found in this period.\n"
             f"Strategy may be too selective — loosen MIN_BODY_RATIO or RSI zones.\n"
             f"Run: {now} WAT"
@@ -396,9 +607,8 @@ def build_report(stats: dict, trades: list[dict], symbol: str) -> str:
         "❌ Needs Work"
     )
 
-    closed = [t for t in trades if t["result"] != "OPEN"][-5:]
     trade_log = ""
-    for t in closed:
+    for t in TradeLedger.from_records(trades).closed()[-5:]:
         icon = "🟢" if t["result"] == "TP" else "🔴"
         ts   = t["entry_time"].strftime("%m-%d %H:%M") \
                if hasattr(t["entry_time"], "strftime") else str(t["entry_time"])
@@ -408,8 +618,16 @@ def build_report(stats: dict, trades: list[dict], symbol: str) -> str:
             f"${t['pnl_dollar']:+.0f} [{ts}]\n"
         )
 
+    mc_block = (
+        f"<b>Monte Carlo — {mc['paths']:,} {mc['method']} paths</b>\n"
+        f"DD p50/p95/p99 : {mc['dd_p50']}% / {mc['dd_p95']}% / {mc['dd_p99']}%\n"
+        f"Return 5–95%   : {mc['return_p5']:+.2f}% … {mc['return_p95']:+.2f}%\n"
+        f"Risk of Ruin   : {mc['risk_of_ruin']}% (DD ≥ {mc['ruin_dd']:.0f}%)\n"
+        f"━━━━━━━━━━━━━━━━━━━━━\n"
+    ) if mc else ""
+
     return (
-        f"📊 <b>{symbol} Backtest — Last {LOOKBACK_DAYS} Days</b>\n"
+        f"📊 <b>{symbol} Backtest — {period}</b>\n"
         f"━━━━━━━━━━━━━━━━━━━━━\n"
         f"Grade          : {grade}\n"
         f"━━━━━━━━━━━━━━━━━━━━━\n"
@@ -431,55 +649,133 @@ def build_report(stats: dict, trades: list[dict], symbol: str) -> str:
         f"━━━━━━━━━━━━━━━━━━━━━\n"
         f"<b>Last 5 Trades</b>\n{trade_log}"
         f"━━━━━━━━━━━━━━━━━━━━━\n"
+        f"{mc_block}"
         f"Initial Equity : ${INITIAL_EQUITY:,.0f}\n"
         f"Risk/Trade     : {RISK_PER_TRADE*100:.0f}%\n"
         f"Run            : {now} WAT"
     )
 
 # ──────────────────────────────
-# MAIN
+# DATA
 # ──────────────────────────────
-def main():
-    print("[INFO] Starting backtest...")
-
-    for symbol in SYMBOLS:
-        print(f"[INFO] Fetching data for {symbol}...")
-        df_1h = fetch_data(symbol, "1h",    500)
-        df_1d = fetch_data(symbol, "1day",  120)
-        df_1w = fetch_data(symbol, "1week", 30)
+HISTORY = (("1h", 500), ("1day", 120), ("1week", 30))
 
-        if df_1h is None or df_1d is None:
-            print(f"[ERROR] No data for {symbol}")
-            continue
-
-        cutoff = pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=LOOKBACK_DAYS)
-        df_1h  = df_1h[df_1h["datetime"] >= cutoff].reset_index(drop=True)
-        df_1d  = df_1d[df_1d["datetime"] >= cutoff].reset_index(drop=True)
+def fetch_history(symbols: list[str], history: tuple = HISTORY,
+                  source: str = BACKTEST_SOURCE) -> dict:
+    """
+    {(symbol, interval): df | None} for every (interval, limit) window.
+    source="store" reads the whole local archive (filled by
+    history.py) without touching the API; the lookback cut in
+    prepare_frames then decides how much of it is tested.
+    """
+    if source == "store":
+        store = CandleStore()
+        return {(symbol, interval): store.read(symbol, interval)
+                for symbol in symbols for interval, _ in history}
+    return fetch_cached_many([
+        (symbol, interval, limit)
+        for symbol in symbols
+        for interval, limit in history
+    ])
+
+def prepare_frames(symbol: str, frames: dict,
+                   lookback_days: int = LOOKBACK_DAYS) -> tuple | None:
+    """
+    Lookback cut + indicators for one symbol, as main() runs it.
+    Returns (df_1h, df_1d, df_1w, instrument), None when data is
+    missing or too short.
+    """
+    df_1h = frames[(symbol, "1h")]
+    df_1d = frames[(symbol, "1day")]
+    df_1w = frames[(symbol, "1week")]
 
-        if len(df_1h) < BB_PERIOD + 5:
-            print(f"[WARN] Not enough bars ({len(df_1h)}) for {symbol}")
-            continue
+    if df_1h is None or df_1d is None:
+        print(f"[ERROR] No data for {symbol}")
+        return None
 
-        print(f"[INFO] {len(df_1h)} × 1h | {len(df_1d)} × 1d | "
-              f"{len(df_1w) if df_1w is not None else 0} × 1w bars")
+    cutoff = pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=lookback_days)
+    df_1h  = df_1h[df_1h["datetime"] >= cutoff].reset_index(drop=True)
+    df_1d  = df_1d[df_1d["datetime"] >= cutoff].reset_index(drop=True)
 
-        df_1h = compute_indicators(df_1h)
-        df_1d["bb_upper"], df_1d["bb_mid"], df_1d["bb_lower"] = bollinger_bands(
-            df_1d["close"], BB_PERIOD, BB_STDDEV
-        )
+    if len(df_1h) < BB_PERIOD + 5:
+        print(f"[WARN] Not enough bars ({len(df_1h)}) for {symbol}")
+        return None
 
-        print("[INFO] Simulating trades...")
-        trades = simulate_trades(df_1h, df_1d, df_1w)
-        print(f"[INFO] {len(trades)} trades found "
-              f"({len([t for t in trades if t['result'] != 'OPEN'])} closed, "
-              f"{len([t for t in trades if t['result'] == 'OPEN'])} open)")
+    print(f"[INFO] {len(df_1h)} × 1h | {len(df_1d)} × 1d | "
+          f"{len(df_1w) if df_1w is not None else 0} × 1w bars")
 
-        stats  = calc_stats(trades, INITIAL_EQUITY)
-        report = build_report(stats, trades, symbol)
+    instrument = get_instrument(symbol).for_prices(df_1h["close"])
+    df_1h = compute_indicators(df_1h, instrument)
+    df_1d["bb_upper"], df_1d["bb_mid"], df_1d["bb_lower"] = bollinger_bands(
+        df_1d["close"], BB_PERIOD, BB_STDDEV
+    )
+    return df_1h, df_1d, df_1w, instrument
 
-        print(report)
-        send_alert(report)
-        print("[INFO] Report sent to Telegram ✅")
+# ──────────────────────────────
+# MAIN
+# ──────────────────────────────
+def main():
+    if BACKTEST_MODE == "walkforward":
+        from walkforward import main as walk_forward
+        return walk_forward()
+    if BACKTEST_MODE == "stream":
+        from stream import main as stream
+        return stream()
+    if BACKTEST_MODE == "batch":
+        from batch import main as batch
+        return batch()
+    if BACKTEST_MODE == "portfolio":
+        from portfolio import main as portfolio
+        return portfolio()
+
+    with instrumented("backtest"):
+        print("[INFO] Starting backtest...")
+
+        print(f"[INFO] Fetching data for {', '.join(SYMBOLS)}...")
+        with span("fetch"):
+            frames = fetch_history(SYMBOLS)
+
+        for symbol in SYMBOLS:
+            with span("prepare", symbol):
+                prepared = prepare_frames(symbol, frames)
+            if prepared is None:
+                continue
+            df_1h, df_1d, df_1w, instrument = prepared
+
+            if os.getenv("BACKTEST_PARITY") == "1":
+                with span("parity", symbol):
+                    mismatches = check_signal_parity(df_1h, df_1d, df_1w,
+                                                     instrument=instrument)
+                print(f"[INFO] Signal parity: {mismatches} mismatched bars")
+
+            print("[INFO] Simulating trades...")
+            with span("simulate", symbol):
+                trades = simulate_trades(df_1h, df_1d, df_1w,
+                                         debug=os.getenv("BACKTEST_DEBUG", "1") == "1",
+                                         instrument=instrument)
+            n_closed = int(trades.is_closed.sum())
+            print(f"[INFO] {len(trades)} trades found "
+                  f"({n_closed} closed, {len(trades) - n_closed} open)")
+            if TRADES_DIR:
+                os.makedirs(TRADES_DIR, exist_ok=True)
+                path = os.path.join(TRADES_DIR, f"{symbol.replace('/', '_')}.parquet")
+                trades.to_parquet(path)
+                print(f"[INFO] Trade ledger written to {path}")
+
+            with span("stats", symbol):
+                stats  = calc_stats(trades, INITIAL_EQUITY)
+            with span("monte_carlo", symbol):
+                mc     = monte_carlo(trades, RISK_PER_TRADE)
+            with span("report", symbol):
+                report = build_report(stats, trades, symbol, mc)
+
+            print(report)
+            with span("alert", symbol):
+                send_alert(report)
+            print("[INFO] Report sent to Telegram ✅")
+
+        with span("deliver"):
+            flush_alerts(timeout=60)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,219 @@
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from align import align_frames
+from backtest import (fetch_history, prepare_frames, simulate_trades, calc_stats,
+                      INITIAL_EQUITY, WAT, BACKTEST_SOURCE)
+from helpers import send_alert, flush_alerts
+from instruments import SYMBOLS, get_instrument
+from shared import SharedFrames, attach
+from telemetry import instrumented, span, count
+
+# ──────────────────────────────
+# CONFIG
+# ──────────────────────────────
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", str(os.cpu_count() or 1)))
+BATCH_YEARS   = float(os.getenv("BATCH_YEARS", "3"))
+BATCH_PERIOD  = os.getenv("BATCH_PERIOD", "YS")      # pandas offset alias: YS | QS | MS
+BATCH_HISTORY = (("1h", 5000), ("1day", 5000), ("1week", 1000))  # API max; store reads all
+TABLE_COLUMNS = ("total_trades", "win_rate", "profit_factor", "return_pct",
+                 "max_drawdown", "open_trades")
+
+# ──────────────────────────────
+# WINDOWS
+# ──────────────────────────────
+def make_windows(times: pd.Series, period: str = BATCH_PERIOD) -> list[tuple[str, int, int]]:
+    """
+    (label, start, stop) bar ranges of df_1h, one per calendar
+    `period` (a pandas offset alias) the history touches. Labels are
+    the first and last bar dates of the window.
+    """
+    if times.empty:
+        return []
+    edges  = pd.date_range(times.iat[0], times.iat[-1], freq=period, tz="UTC")
+    bounds = np.unique([0, *times.searchsorted(edges), len(times)])
+    return [(f"{times.iat[lo]:%Y-%m-%d} → {times.iat[hi - 1]:%Y-%m-%d}", int(lo), int(hi))
+            for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+# ──────────────────────────────
+# WORKERS
+# ──────────────────────────────
+# Filled once per worker process by _init: every symbol's frames and
+# alignment sit in one shared block; a job is just (symbol, window).
+_worker: dict = {}
+
+def _init(handle):
+    shm, data = attach(handle)
+    sys.stdout = open(os.devnull, "w")     # simulate_trades is chatty
+    _worker.update(data, shm=shm)
+
+def _run(job: tuple) -> dict:
+    symbol, label, start, stop = job
+    row = {"symbol": symbol, "window": label, "bars": stop - start}
+    try:
+        w      = _worker
+        trades = simulate_trades(w[f"{symbol}|1h"], w[f"{symbol}|1day"], w[f"{symbol}|1week"],
+                                 instrument=get_instrument(symbol),
+                                 aligned={"1day":  w[f"{symbol}|align_1day"],
+                                          "1week": w[f"{symbol}|align_1week"]},
+                                 start=start, stop=stop)
+        return {**row, **calc_stats(trades, INITIAL_EQUITY), "error": None}
+    except Exception as e:
+        return {**row, "error": f"{type(e).__name__}: {e}"}
+
+def run_batch(prepared: dict, period: str = BATCH_PERIOD,
+              workers: int = BATCH_WORKERS) -> pd.DataFrame:
+    """
+    simulate_trades + calc_stats for every (symbol, window) on a
+    process pool; each window starts from INITIAL_EQUITY. prepared is
+    {symbol: (df_1h, df_1d, df_1w)} with indicators computed; frames
+    and align_frames indices go into shared memory once, so jobs
+    carry only names and bar ranges. A job that raises (or is lost
+    with a crashed worker) becomes a row with `error` set instead of
+    stopping the batch. One row per job, in submission order.
+    """
+    shared, jobs = {}, []
+    for symbol, (df_1h, df_1d, df_1w) in prepared.items():
+        aligned = align_frames({"1h": df_1h, "1day": df_1d, "1week": df_1w}, "1h")
+        shared.update({f"{symbol}|1h": df_1h, f"{symbol}|1day": df_1d,
+                       f"{symbol}|1week": df_1w,
+                       f"{symbol}|align_1day":  aligned["1day"],
+                       f"{symbol}|align_1week": aligned.get("1week")})
+        jobs += [(symbol, *window) for window in make_windows(df_1h["datetime"], period)]
+    if not jobs:
+        return pd.DataFrame()
+
+    rows = [None] * len(jobs)
+    with SharedFrames(shared) as frames, \
+            ProcessPoolExecutor(max(1, min(workers, len(jobs))), initializer=_init,
+                                initargs=(frames.handle,)) as pool:
+        futures = {pool.submit(_run, job): k for k, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            k = futures[future]
+            try:
+                rows[k] = future.result()
+            except Exception as e:
+                symbol, label, start, stop = jobs[k]
+                rows[k] = {"symbol": symbol, "window": label, "bars": stop - start,
+                           "error": f"{type(e).__name__}: {e}"}
+            count("batch.failed" if rows[k]["error"] else "batch.done")
+    return pd.DataFrame(rows)
+
+def summarize(results: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per-symbol totals over its windows (failed ones excluded).
+    A window with no closed trades has no stats and counts as a flat
+    0% window with no drawdown.
+    """
+    ok = results[results["error"].isna()]
+    if ok.empty:
+        return pd.DataFrame()
+    ok = ok.assign(**{c: ok[c].fillna(0) if c in ok else 0
+                      for c in ("total_trades", "wins", "return_pct", "max_drawdown")})
+    by = ok.groupby("symbol", sort=False)
+    summary = pd.DataFrame({
+        "windows":      by.size(),
+        "positive":     by["return_pct"].apply(lambda r: int((r > 0).sum())),
+        "trades":       by["total_trades"].sum().astype(int),
+        "win_rate":     (by["wins"].sum() / by["total_trades"].sum() * 100).fillna(0).round(1),
+        "avg_return":   by["return_pct"].mean().round(2),
+        "worst_dd":     by["max_drawdown"].max(),
+    })
+    failed = results[results["error"].notna()].groupby("symbol").size()
+    summary["failed"] = failed.reindex(summary.index, fill_value=0)
+    return summary
+
+def build_batch_report(summary: pd.DataFrame, results: pd.DataFrame,
+                       period: str) -> str:
+    now    = datetime.now(WAT).strftime("%Y-%m-%d %H:%M")
+    failed = int(results["error"].notna().sum()) if not results.empty else 0
+    if summary.empty:
+        return (
+            f"📉 <b>Batch Backtest — {period} windows</b>\n"
+            f"No completed windows ({failed} failed).\n"
+            f"Run: {now} WAT"
+        )
+    lines = "".join(
+        f"{symbol:<9} {row.positive:>2}/{row.windows:<2} {row.trades:>5} "
+        f"{row.win_rate:>5.1f}% {row.avg_return:>+7.2f}% {row.worst_dd:>5.1f}%\n"
+        for symbol, row in zip(summary.index, summary.itertuples())
+    )
+    return (
+        f"🗂 <b>Batch Backtest — {len(summary)} symbols, {period} windows</b>\n"
+        f"━━━━━━━━━━━━━━━━━━━━━\n"
+        f"<pre>Symbol    +/win  Trd    WR   AvgRet  MaxDD\n{lines}</pre>"
+        f"━━━━━━━━━━━━━━━━━━━━━\n"
+        f"Jobs           : {len(results)} ({failed} failed)\n"
+        f"Initial Equity : ${INITIAL_EQUITY:,.0f} per window\n"
+        f"Run            : {now} WAT"
+    )
+
+# ──────────────────────────────
+# MAIN
+# ──────────────────────────────
+def main():
+    parser = argparse.ArgumentParser(description="Parallel multi-symbol, multi-period backtest")
+    parser.add_argument("--symbol", action="append", help="repeatable; default WATCHLIST")
+    parser.add_argument("--years", type=float, default=BATCH_YEARS)
+    parser.add_argument("--period", default=BATCH_PERIOD,
+                        help="window length as a pandas offset alias (YS, QS, MS)")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS)
+    parser.add_argument("--csv", help="write the per-window table here")
+    args, _ = parser.parse_known_args()
+    symbols = args.symbol or SYMBOLS
+
+    with instrumented("batch"):
+        print(f"[INFO] Batch backtest: {len(symbols)} symbols × {args.period} windows "
+              f"over {args.years:g} years on {args.workers} workers...")
+        with span("fetch"):
+            frames = fetch_history(symbols, BATCH_HISTORY)
+
+        prepared, errors = {}, []
+        for symbol in symbols:
+            with span("prepare", symbol):
+                try:
+                    ready = prepare_frames(symbol, frames, round(args.years * 365.25))
+                except Exception as e:
+                    ready = None
+                    print(f"[ERROR] Preparing {symbol} failed: {e}")
+            if ready is None:
+                errors.append({"symbol": symbol, "error": "no usable data"})
+                continue
+            first = ready[0]["datetime"].iat[0]
+            asked = pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=args.years * 365.25)
+            if first - asked > pd.Timedelta(days=7):
+                print(f"[WARN] {symbol}: history starts {first:%Y-%m-%d}, "
+                      f"short of --years {args.years:g}"
+                      + (" (BACKTEST_SOURCE=api caps 1h at 5000 bars; "
+                         "use BACKTEST_SOURCE=store)" if BACKTEST_SOURCE != "store" else ""))
+            prepared[symbol] = ready[:3]
+
+        with span("batch"):
+            results = run_batch(prepared, args.period, args.workers)
+        results = pd.concat([results, pd.DataFrame(errors)], ignore_index=True)
+        results["bars"] = results["bars"].astype("Int64") if "bars" in results else pd.NA
+        if results.empty:
+            print("[WARN] Nothing to run")
+            return
+
+        columns = ["symbol", "window", "bars",
+                   *[c for c in TABLE_COLUMNS if c in results], "error"]
+        print(results[columns].to_string(index=False))
+        if args.csv:
+            results.to_csv(args.csv, index=False)
+            print(f"[INFO] Results written to {args.csv}")
+
+        with span("report"):
+            report = build_batch_report(summarize(results), results, args.period)
+        print(report)
+        with span("alert"):
+            send_alert(report)
+        with span("deliver"):
+            flush_alerts(timeout=60)
+
+if __name__ == "__main__":
+    main()
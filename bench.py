@@ -0,0 +1,408 @@
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+
+# ──────────────────────────────
+# IMPORT TIME
+# ──────────────────────────────
+# Each case runs in a fresh interpreter; "eager" forces the clients
+# that helpers/state used to build at import time, i.e. the old cost.
+IMPORT_CASES = {
+    "backtest":        "import backtest",
+    "main":            "import main",
+    "helpers":         "import helpers",
+    "helpers (eager)": "import helpers; helpers.get_finbert(); helpers.get_bot()",
+    "state":           "import state",
+}
+
+_PROBE = (
+    "import time, resource\n"
+    "t = time.perf_counter()\n"
+    "{stmt}\n"
+    "print(time.perf_counter() - t, "
+    "resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)\n"
+)
+
+def bench_imports(repeat: int = 5) -> dict:
+    results = {}
+    for name, stmt in IMPORT_CASES.items():
+        times, rss = [], 0
+        for _ in range(repeat):
+            proc = subprocess.run([sys.executable, "-c", _PROBE.format(stmt=stmt)],
+                                  capture_output=True, text=True)
+            if proc.returncode != 0:
+                err = proc.stderr.strip().splitlines()
+                results[name] = {"error": err[-1] if err else "failed"}
+                break
+            elapsed, peak = proc.stdout.split()
+            times.append(float(elapsed))
+            rss = max(rss, int(peak))
+        else:
+            results[name] = {"median_s": round(statistics.median(times), 4),
+                             "peak_rss_mb": round(rss / 1024, 1)}
+    return results
+
+def print_table(results: dict):
+    for name, row in results.items():
+        if "error" in row:
+            print(f"{name:<20} ERROR {row['error']}")
+        else:
+            print(f"{name:<20} {row['median_s']:>8.3f}s {row['peak_rss_mb']:>8.1f} MB")
+
+# ──────────────────────────────
+# SENTIMENT BACKENDS
+# ──────────────────────────────
+# Fixed corpus so fp32 / int8 labels can be compared run to run.
+HEADLINE_CORPUS = [
+    "Gold price hits record high as Fed signals rate cuts",
+    "Gold slips as dollar strengthens ahead of jobs report",
+    "Gold steady as traders await US inflation data",
+    "Bullion surges on safe-haven demand amid Middle East tensions",
+    "Gold falls for third straight session on strong Treasury yields",
+    "Analysts raise gold price forecast to $2,500 for year-end",
+    "Gold prices little changed in thin holiday trading",
+    "Central bank gold buying hits fresh quarterly record",
+    "Gold tumbles as hawkish Fed minutes lift the dollar",
+    "Gold rebounds after sharp sell-off as bargain hunters step in",
+    "Goldman Sachs sees gold rally extending into next year",
+    "Gold ETF outflows continue for fourth week",
+    "Gold drifts lower as risk appetite improves on trade deal hopes",
+    "Spot gold flat; investors eye Powell testimony",
+    "Gold climbs as weaker US data revives rate-cut bets",
+    "Gold price outlook: consolidation likely before CPI release",
+    "Gold slumps to two-month low as real yields climb",
+    "Gold extends gains as geopolitical risks mount",
+    "Physical gold demand in India weakens on high prices",
+    "Gold holds near $2,000 as markets weigh recession risks",
+    "Silver and gold retreat as dollar index jumps",
+    "Gold set for weekly gain on softer dollar",
+    "Gold price forecast: bears target $1,900 support",
+    "Hedge funds boost bullish gold bets to highest since 2020",
+    "Gold price crashes after surprise rate hike",
+    "Gold trades sideways as volatility hits multi-year low",
+    "Gold jumps 2% as banking turmoil spurs safe-haven buying",
+    "Gold eases as profit-taking sets in after record run",
+    "China's gold imports fall sharply in latest month",
+    "Gold price forecast: upside momentum remains intact",
+]
+
+_SENTIMENT_PROBE = (
+    "import json, resource, time, helpers\n"
+    "corpus = json.loads({corpus!r})\n"
+    "t = time.perf_counter(); helpers.get_finbert({backend!r})\n"
+    "load_s = time.perf_counter() - t\n"
+    "helpers.score_headlines(corpus[:2], {backend!r})\n"
+    "t = time.perf_counter()\n"
+    "single = [helpers.score_headlines([h], {backend!r})[0] for h in corpus]\n"
+    "single_s = time.perf_counter() - t\n"
+    "t = time.perf_counter(); batch = helpers.score_headlines(corpus, {backend!r})\n"
+    "batch_s = time.perf_counter() - t\n"
+    "print(json.dumps({{'load_s': load_s, 'single_s': single_s, "
+    "'batch_s': batch_s, 'labels': batch, 'single_labels': single, "
+    "'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}}))\n"
+)
+
+def bench_sentiment(backends=("fp32", "int8"), window: int = 15) -> dict:
+    """
+    Latency per headline and peak RSS per backend (each in its own
+    interpreter), plus label / bias parity against the first backend
+    over the fixed corpus and its rolling `window`-headline slices.
+    """
+    from helpers import summarize_labels
+
+    runs = {}
+    for backend in backends:
+        probe = _SENTIMENT_PROBE.format(corpus=json.dumps(HEADLINE_CORPUS),
+                                        backend=backend)
+        proc  = subprocess.run([sys.executable, "-c", probe],
+                               capture_output=True, text=True)
+        if proc.returncode != 0:
+            err = proc.stderr.strip().splitlines()
+            runs[backend] = {"error": err[-1] if err else "failed"}
+            continue
+        runs[backend] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    reference = runs.get(backends[0], {}).get("labels")
+    results   = {}
+    n         = len(HEADLINE_CORPUS)
+    for backend, run in runs.items():
+        if "error" in run:
+            results[backend] = run
+            continue
+        row = {
+            "load_s":          round(run["load_s"], 2),
+            "ms_per_headline": round(run["single_s"] / n * 1000, 2),
+            "ms_per_headline_batched": round(run["batch_s"] / n * 1000, 2),
+            "peak_rss_mb":     round(run["peak_rss_mb"], 1),
+        }
+        if reference:
+            labels = run["labels"]
+            slices = range(0, n - window + 1)
+            row["label_agreement"] = round(
+                sum(a == b for a, b in zip(labels, reference)) / n * 100, 1)
+            row["bias_agreement"] = round(
+                sum(summarize_labels(labels[i:i + window])[3] ==
+                    summarize_labels(reference[i:i + window])[3]
+                    for i in slices) / len(slices) * 100, 1)
+            row["corpus_bias"] = summarize_labels(labels)[3]
+        results[backend] = row
+    return results
+
+# ──────────────────────────────
+# SYNTHETIC DATA
+# ──────────────────────────────
+def synthetic_ohlcv(n: int, seed: int = 0, start: str = "2015-01-05",
+                    freq: str = "1h", price: float = 2000.0, vol: float = 0.003,
+                    gap_prob: float = 0.002, flat_prob: float = 0.01,
+                    bad_tick_prob: float = 0.0005) -> pd.DataFrame:
+    """
+    Seeded geometric random walk with the warts real feeds have:
+    missing bars with a price jump on reopen (gaps), flat candles
+    (high == low) and the odd zero low. Same seed, same frame.
+    """
+    rng   = np.random.default_rng(seed)
+    steps = np.ones(n, dtype=np.int64)
+    gaps  = rng.random(n) < gap_prob
+    steps[gaps] = rng.integers(2, 64, gaps.sum())
+    times = pd.Timestamp(start, tz="UTC") + \
+            pd.Timedelta(freq) * (np.cumsum(steps) - steps[0])
+
+    rets  = rng.normal(0, vol, n)
+    jumps = np.where(gaps, rng.normal(0, vol * 10, n), 0.0)
+    log_c = np.log(price) + np.cumsum(jumps + rets)
+    close = np.exp(log_c)
+    open_ = np.exp(log_c - rets)
+    wick  = np.abs(rng.normal(0, vol / 2, (2, n)))
+    high  = np.maximum(open_, close) * (1 + wick[0])
+    low   = np.minimum(open_, close) * (1 - wick[1])
+
+    flat  = rng.random(n) < flat_prob
+    high[flat] = low[flat] = close[flat] = open_[flat]
+    low[rng.random(n) < bad_tick_prob] = 0.0
+
+    return pd.DataFrame({"datetime": times, "open": open_, "high": high,
+                         "low": low, "close": close})
+
+def resample_ohlcv(df: pd.DataFrame, rule: str) -> pd.DataFrame:
+    """Higher-timeframe bars from df ("1D", "W-MON", ...), empty periods dropped."""
+    g = df.set_index("datetime").resample(rule, label="left", closed="left")
+    return pd.DataFrame({"open": g["open"].first(), "high": g["high"].max(),
+                         "low": g["low"].min(), "close": g["close"].last()}) \
+             .dropna().reset_index()
+
+def synthetic_frames(n: int, seed: int = 0,
+                     symbol: str = "XAU/USD") -> dict:
+    """{(symbol, interval): df} for 1h / 1day / 1week, like fetch_history."""
+    df_1h = synthetic_ohlcv(n, seed)
+    return {(symbol, "1h"):    df_1h,
+            (symbol, "1day"):  resample_ohlcv(df_1h, "1D"),
+            (symbol, "1week"): resample_ohlcv(df_1h, "W-MON")}
+
+# ──────────────────────────────
+# OFFLINE STAND-INS
+# ──────────────────────────────
+def _keyword_labels(titles: list[str], backend=None) -> list[str]:
+    # Used only when torch / transformers are not installed
+    up, down = ("high", "gain", "climb", "surge", "jump", "rall"), \
+               ("fall", "slip", "low", "tumble", "slump", "crash")
+    return ["Positive" if any(w in t.lower() for w in up) else
+            "Negative" if any(w in t.lower() for w in down) else "Neutral"
+            for t in titles]
+
+@contextlib.contextmanager
+def offline(frames: dict | None = None, headlines: list[str] = None):
+    """
+    Swaps the network edges for in-process stand-ins: Twelve Data
+    (fetch_data serves `frames`), the news RSS feed (`headlines`),
+    Telegram (alerts are collected) and the Google Sheet (local
+    in-memory state). FinBERT stays real when installed, otherwise a
+    keyword scorer stands in. Yields a namespace with `alerts` and
+    `scorer`; everything is restored on exit.
+    """
+    import importlib.util
+    import alerts, helpers, state
+
+    frames    = frames or {}
+    headlines = headlines or HEADLINE_CORPUS
+    sent      = []
+
+    def fetch_data(symbol, interval, limit=100, timeout=15):
+        df = frames.get((symbol, interval))
+        return None if df is None else df.tail(limit).reset_index(drop=True)
+
+    def parse(url):
+        return SimpleNamespace(entries=[SimpleNamespace(title=t) for t in headlines])
+
+    has_model = importlib.util.find_spec("torch") is not None and \
+                importlib.util.find_spec("transformers") is not None
+    patches = [
+        (helpers, "fetch_data", fetch_data),
+        (helpers.feedparser, "parse", parse),
+        (helpers, "send_alert", sent.append),
+        (alerts, "send_alert", sent.append),
+        (helpers, "_headline_cache", helpers.HeadlineCache(path=None)),
+        (state, "_store", state.StateStore(":memory:", mirror=False)),
+    ]
+    for name in ("main", "backtest", "walkforward"):
+        if name in sys.modules:
+            patches.append((sys.modules[name], "send_alert", sent.append))
+    if not has_model:
+        patches.append((helpers, "score_headlines", _keyword_labels))
+
+    saved = [(obj, attr, getattr(obj, attr)) for obj, attr, _ in patches]
+    for obj, attr, value in patches:
+        setattr(obj, attr, value)
+    try:
+        yield SimpleNamespace(alerts=sent, scorer="finbert" if has_model else "keyword")
+    finally:
+        for obj, attr, value in saved:
+            setattr(obj, attr, value)
+
+# ──────────────────────────────
+# HOT PATHS
+# ──────────────────────────────
+HOTPATH_SIZES  = (1_000, 10_000, 100_000, 1_000_000)
+SCAN_SAMPLE    = 2_000      # scan_signal bars timed per size
+MC_BENCH_PATHS = 100_000    # monte_carlo paths per size (budget: < 1s)
+
+def _time(fn, repeat: int) -> float:
+    """Best wall time of `repeat` calls, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+def bench_hotpaths(sizes=HOTPATH_SIZES, repeat: int = 3, seed: int = 0) -> dict:
+    """
+    Seconds per call for the indicator, signal, simulator, stats and
+    Monte Carlo paths at each bar count, on seeded synthetic data. scan_signal is
+    the per-bar reference, so it is timed on SCAN_SAMPLE bars and
+    also reported per bar.
+    """
+    import backtest
+    from align import align_frames
+    from helpers import rsi, atr, bollinger_bands, analyze_sentiment, clear_sentiment_cache
+    from strategy import generate_signal
+    from montecarlo import monte_carlo
+
+    results = {"meta": {"python": platform.python_version(),
+                        "numpy": np.__version__, "pandas": pd.__version__,
+                        "seed": seed, "repeat": repeat},
+               "sizes": {}}
+    quiet = contextlib.redirect_stdout(io.StringIO())
+
+    for n in sizes:
+        frames = synthetic_frames(n, seed)
+        df_1h, df_1d, df_1w = (frames[("XAU/USD", i)] for i in ("1h", "1day", "1week"))
+        row = {
+            "rsi":             _time(lambda: rsi(df_1h["close"]), repeat),
+            "atr":             _time(lambda: atr(df_1h), repeat),
+            "bollinger_bands": _time(lambda: bollinger_bands(df_1h["close"]), repeat),
+        }
+
+        copies = [(df_1h.copy(), df_1d.copy(), df_1w) for _ in range(repeat)]
+        row["generate_signal"] = _time(lambda: generate_signal(*copies.pop()), repeat)
+
+        with quiet:
+            prepared = backtest.prepare_frames("XAU/USD", frames, lookback_days=50_000)
+        b_1h, b_1d, b_1w, _ = prepared
+        aligned = align_frames({"1h": b_1h, "1day": b_1d, "1week": b_1w}, "1h")
+        bars    = np.linspace(1, len(b_1h) - 1, min(SCAN_SAMPLE, len(b_1h) - 1)).astype(int)
+        w_idx   = aligned["1week"]
+        scan_s  = _time(lambda: [backtest.scan_signal(b_1h, i, b_1d, aligned["1day"][i],
+                                                      b_1w, w_idx[i]) for i in bars], 1)
+        row["scan_signal"]        = scan_s
+        row["scan_signal_per_bar"] = scan_s / len(bars)
+
+        def simulate():
+            with contextlib.redirect_stdout(io.StringIO()):
+                return backtest.simulate_trades(b_1h, b_1d, b_1w)
+        row["simulate_trades"] = _time(simulate, repeat)
+        trades = simulate()
+        row["calc_stats"]      = _time(lambda: backtest.calc_stats(trades, backtest.INITIAL_EQUITY),
+                                       repeat)
+        row["monte_carlo"]     = _time(lambda: monte_carlo(trades, backtest.RISK_PER_TRADE,
+                                                           paths=MC_BENCH_PATHS, seed=seed),
+                                       repeat)
+        row["trades"] = len(trades)
+        results["sizes"][str(n)] = row
+        print(f"[INFO] {n:>9,} bars " + " ".join(
+            f"{k}={v:.4f}" for k, v in row.items() if k != "trades"))
+
+    with offline() as env, quiet:
+        clear_sentiment_cache()
+        cold = _time(lambda: analyze_sentiment("XAU/USD", force=True), 1)
+        warm = _time(lambda: analyze_sentiment("XAU/USD", force=True), repeat)
+    results["analyze_sentiment"] = {"cold": cold, "warm": warm, "scorer": env.scorer,
+                                    "headlines": len(HEADLINE_CORPUS[:15])}
+    return results
+
+def compare(current: dict, baseline: dict, tolerance: float = 0.2) -> list[str]:
+    """Timings more than `tolerance` slower than the baseline file."""
+    slower = []
+    for n, row in current.get("sizes", {}).items():
+        for name, secs in row.items():
+            old = baseline.get("sizes", {}).get(n, {}).get(name)
+            if name != "trades" and old and secs > old * (1 + tolerance):
+                slower.append(f"{name} @ {n} bars: {old:.4f}s -> {secs:.4f}s "
+                              f"({secs / old:.2f}x)")
+    return slower
+
+# ──────────────────────────────
+# MAIN
+# ──────────────────────────────
+def main():
+    parser = argparse.ArgumentParser(description="Hot-path benchmarks")
+    sub    = parser.add_subparsers(dest="suite", required=True)
+
+    imports = sub.add_parser("imports", help="module import time / RSS")
+    imports.add_argument("--repeat", type=int, default=5)
+    imports.add_argument("--json", help="write results to this file")
+
+    sentiment = sub.add_parser("sentiment", help="FinBERT backend latency / parity")
+    sentiment.add_argument("--backends", default="fp32,int8")
+    sentiment.add_argument("--json", help="write results to this file")
+
+    hotpaths = sub.add_parser("hotpaths", help="indicator / signal / simulator timings")
+    hotpaths.add_argument("--sizes", default=",".join(str(n) for n in HOTPATH_SIZES))
+    hotpaths.add_argument("--repeat", type=int, default=3)
+    hotpaths.add_argument("--seed", type=int, default=0)
+    hotpaths.add_argument("--compare", help="baseline JSON from an earlier run")
+    hotpaths.add_argument("--tolerance", type=float, default=0.2)
+    hotpaths.add_argument("--json", help="write results to this file")
+
+    args = parser.parse_args()
+    if args.suite == "imports":
+        results = bench_imports(args.repeat)
+        print_table(results)
+    elif args.suite == "sentiment":
+        results = bench_sentiment(tuple(args.backends.split(",")))
+        for backend, row in results.items():
+            print(f"{backend:<6} {json.dumps(row)}")
+    elif args.suite == "hotpaths":
+        results = bench_hotpaths([int(n) for n in args.sizes.split(",")],
+                                 args.repeat, args.seed)
+        if args.compare:
+            with open(args.compare) as f:
+                slower = compare(results, json.load(f), args.tolerance)
+            for line in slower:
+                print(f"[REGRESSION] {line}")
+            print(f"[INFO] {len(slower)} regressions beyond {args.tolerance:.0%}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
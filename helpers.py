@@ -1,68 +1,124 @@
 import os
-import asyncio
+import json
+import time
+import hashlib
+import threading
 import warnings
 import requests
+from concurrent.futures import ThreadPoolExecutor, wait
+from requests.adapters import HTTPAdapter
 import pandas as pd
 import feedparser
-import torch
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-from telegram import Bot
-from telegram.request import HTTPXRequest
-from telegram.error import TimedOut, NetworkError
 from urllib.parse import quote
+from keys import KeyScheduler
+from instruments import SYMBOLS, get_instrument
+from alerts import get_bot, send_alert, alert_batch, flush_alerts
+from telemetry import count
 
 warnings.filterwarnings("ignore", category=FutureWarning, module="huggingface_hub")
 
-SYMBOLS = ["XAU/USD"]
 API_KEYS = os.getenv("TD_API_KEYS", "").split(",")
-TELEGRAM_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+FETCH_WORKERS    = int(os.getenv("FETCH_WORKERS", "8"))
+FETCH_BUDGET     = float(os.getenv("FETCH_BUDGET", "45"))
+
+FINBERT_MODEL       = "yiyanghkust/finbert-tone"
+SENTIMENT_BACKEND   = os.getenv("SENTIMENT_BACKEND", "fp32")   # fp32 | int8
+SENTIMENT_CACHE     = os.getenv("SENTIMENT_CACHE", ".state/sentiment_cache.json")
+SENTIMENT_CACHE_TTL = float(os.getenv("SENTIMENT_CACHE_TTL", str(7 * 86400)))
+SENTIMENT_CACHE_MAX = int(os.getenv("SENTIMENT_CACHE_MAX", "5000"))
 
 os.environ["HF_HOME"] = "/tmp/.cache"
 os.environ["TRANSFORMERS_CACHE"] = "/tmp/.cache"
 
-request = HTTPXRequest(connect_timeout=30, read_timeout=30,
-                       write_timeout=30, pool_timeout=30)
-bot = Bot(token=TELEGRAM_TOKEN, request=request)
-
 labels = ["Positive", "Negative", "Neutral"]
-tokenizer = AutoTokenizer.from_pretrained("yiyanghkust/finbert-tone", use_fast=False)
-model = AutoModelForSequenceClassification.from_pretrained("yiyanghkust/finbert-tone")
-
-# ── Telegram ──────────────────────────────────────────
-async def _send(msg: str):
-    try:
-        await bot.send_message(
-            chat_id=TELEGRAM_CHAT_ID,
-            text=msg,
-            parse_mode="HTML"
-        )
-    except (TimedOut, NetworkError) as e:
-        print(f"[WARN] Telegram error: {e}")
-    except Exception as e:
-        print(f"[WARN] Telegram unexpected: {e}")
-
-def send_alert(msg: str):
-    try:
-        asyncio.run(_send(msg))
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(_send(msg))
-        loop.close()
+
+# ── Lazy clients ──────────────────────────────────────
+# torch / transformers load on first use (telegram: alerts.get_bot),
+# so importing helpers (backtest.py, a no-signal main.py run) stays cheap.
+_finbert: dict = {}
+_finbert_lock = threading.Lock()
+
+def get_finbert(backend: str | None = None):
+    """
+    (tokenizer, model), loaded once per process and backend.
+    fp32: the stock model. int8: torch dynamic quantization of every
+    Linear layer — smaller and faster on CPU-only runners.
+    """
+    backend = backend or SENTIMENT_BACKEND
+    with _finbert_lock:
+        if backend not in _finbert:
+            import torch
+            from transformers import AutoTokenizer, AutoModelForSequenceClassification
+            tokenizer = AutoTokenizer.from_pretrained(FINBERT_MODEL, use_fast=True)
+            model     = AutoModelForSequenceClassification.from_pretrained(FINBERT_MODEL)
+            model.eval()
+            if backend == "int8":
+                model = torch.quantization.quantize_dynamic(
+                    model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+            elif backend != "fp32":
+                raise ValueError(f"Unknown SENTIMENT_BACKEND: {backend}")
+            _finbert[backend] = (tokenizer, model)
+        return _finbert[backend]
 
 # ── Market Data ───────────────────────────────────────
-def fetch_data(symbol: str, interval: str, limit: int = 100):
+_http      = None
+_http_lock = threading.Lock()
+
+def http_session() -> requests.Session:
+    """Shared keep-alive session, pooled for FETCH_WORKERS threads."""
+    global _http
+    with _http_lock:
+        if _http is None:
+            _http = requests.Session()
+            _http.mount("https://", HTTPAdapter(pool_connections=4,
+                                                pool_maxsize=FETCH_WORKERS))
+        return _http
+
+_keys = None
+
+def key_scheduler() -> KeyScheduler:
+    """Process-wide scheduler over API_KEYS (see keys.py)."""
+    global _keys
+    with _http_lock:
+        if _keys is None:
+            _keys = KeyScheduler(API_KEYS)
+        return _keys
+
+def fetch_data(symbol: str, interval: str, limit: int = 100,
+               timeout: float = 15, start: pd.Timestamp | None = None,
+               end: pd.Timestamp | None = None):
+    """
+    Newest `limit` bars, or the newest `limit` in [start, end] (UTC)
+    when a window is given. A window the API has no bars for comes
+    back as an empty frame rather than None, which means failure.
+    """
     base_url = "https://api.twelvedata.com/time_series"
-    for key in API_KEYS:
+    keys     = key_scheduler()
+    window   = "" if start is None else (
+        f"&start_date={quote(f'{start:%Y-%m-%d %H:%M:%S}')}"
+        f"&end_date={quote(f'{end:%Y-%m-%d %H:%M:%S}')}&timezone=UTC"
+    )
+    for _ in range(len(keys.keys)):
+        key = keys.acquire(max_wait=FETCH_BUDGET)
+        if key is None:
+            print("[WARN] Every Twelve Data key is out of credit")
+            break
         try:
-            r = requests.get(
+            count("http.twelvedata")
+            r = http_session().get(
                 f"{base_url}?symbol={symbol}&interval={interval}"
-                f"&outputsize={limit}&apikey={key.strip()}",
-                timeout=15
+                f"&outputsize={limit}{window}&apikey={key}",
+                timeout=timeout
             )
+            if r.status_code == 429:
+                keys.park(key)
+                continue
             if r.status_code == 200:
                 data = r.json()
+                if data.get("code") == 429:
+                    keys.park(key, daily="day" in str(data.get("message", "")).lower())
+                    continue
                 if "values" in data:
                     df = pd.DataFrame(data["values"])
                     df["datetime"] = pd.to_datetime(df["datetime"], utc=True)
@@ -70,10 +126,37 @@ def fetch_data(symbol: str, interval: str, limit: int = 100):
                     df = df.astype({"open": float, "high": float,
                                     "low": float, "close": float})
                     return df
+                if window and "no data" in str(data.get("message", "")).lower():
+                    return pd.DataFrame({"datetime": pd.to_datetime([], utc=True),
+                                         **{c: pd.Series(dtype=float)
+                                            for c in ("open", "high", "low", "close")}})
         except Exception:
             continue
     return None
 
+def fetch_many(jobs: list[tuple[str, str, int]], timeout: float = 15,
+               budget: float = FETCH_BUDGET) -> dict:
+    """
+    Runs fetch_data for every (symbol, interval, limit) job at once
+    over the pooled session. Jobs still running after `budget`
+    seconds come back as None.
+    Returns {(symbol, interval): DataFrame | None}.
+    """
+    results = {(symbol, interval): None for symbol, interval, _ in jobs}
+    if not jobs:
+        return results
+    pool    = ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, len(jobs)))
+    futures = {pool.submit(fetch_data, symbol, interval, limit, timeout):
+               (symbol, interval) for symbol, interval, limit in jobs}
+    done, pending = wait(futures, timeout=budget)
+    for future in done:
+        results[futures[future]] = future.result()
+    for future in pending:
+        print(f"[WARN] Fetch {futures[future]} exceeded {budget:.0f}s budget")
+    pool.shutdown(wait=False, cancel_futures=True)
+    key_scheduler().save()
+    return results
+
 # ── Indicators ────────────────────────────────────────
 def rsi(series: pd.Series, period: int = 14) -> pd.Series:
     """Wilder's smoothed RSI."""
@@ -109,36 +192,145 @@ def ema(series: pd.Series, period: int) -> pd.Series:
 # ── Sentiment ─────────────────────────────────────────
 _sentiment_cache: dict = {}
 
+class HeadlineCache:
+    """
+    Disk-backed FinBERT label per headline, keyed by a hash of the
+    model version + title so a model change never serves old labels.
+    Entries expire `ttl` seconds after scoring; beyond `max_entries`
+    the least recently used are dropped on save.
+    """
+
+    def __init__(self, path: str | None = SENTIMENT_CACHE,
+                 version: str = f"{FINBERT_MODEL}:{SENTIMENT_BACKEND}",
+                 ttl: float = SENTIMENT_CACHE_TTL,
+                 max_entries: int = SENTIMENT_CACHE_MAX):
+        self.path        = path
+        self.version     = version
+        self.ttl         = ttl
+        self.max_entries = max_entries
+        self.hits        = 0
+        self.misses      = 0
+        self.entries     = {}
+        self._lock       = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def _key(self, title: str) -> str:
+        return hashlib.sha256(f"{self.version}\n{title}".encode()).hexdigest()[:32]
+
+    def get(self, title: str) -> str | None:
+        with self._lock:
+            entry = self.entries.get(self._key(title))
+            now   = time.time()
+            if entry is None or now - entry["scored"] > self.ttl:
+                self.misses += 1
+                count("cache.headline_miss")
+                return None
+            entry["used"] = now
+            self.hits += 1
+            count("cache.headline_hit")
+            return entry["label"]
+
+    def put(self, title: str, label: str):
+        now = time.time()
+        with self._lock:
+            self.entries[self._key(title)] = {"label": label, "scored": now, "used": now}
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            now  = time.time()
+            live = [(k, e) for k, e in self.entries.items()
+                    if now - e["scored"] <= self.ttl]
+            live.sort(key=lambda item: item[1]["used"], reverse=True)
+            self.entries = dict(live[:self.max_entries])
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.entries, f)
+            os.replace(tmp, self.path)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / lookups * 100, 1) if lookups else 0.0,
+                "entries": len(self.entries)}
+
+_headline_cache: HeadlineCache | None = None
+
+def headline_cache() -> HeadlineCache:
+    global _headline_cache
+    with _finbert_lock:
+        if _headline_cache is None:
+            _headline_cache = HeadlineCache()
+        return _headline_cache
+
+def score_headlines(titles: list[str], backend: str | None = None) -> list[str]:
+    """FinBERT labels for all titles in one padded batch."""
+    if not titles:
+        return []
+    import torch
+    tokenizer, model = get_finbert(backend)
+    # Fast tokenizers are not re-entrant; pipeline workers take turns
+    with _finbert_lock:
+        inputs = tokenizer(titles, return_tensors="pt", padding=True,
+                           truncation=True, max_length=256)
+        with torch.no_grad():
+            outputs = model(**inputs)
+    return [labels[i] for i in outputs.logits.argmax(dim=1).tolist()]
+
+def summarize_labels(headline_labels: list[str]):
+    """(positive%, negative%, neutral%, net_bias) from headline labels."""
+    summary = {"Positive": 0, "Negative": 0, "Neutral": 0}
+    for label in headline_labels:
+        summary[label] += 1
+
+    total = sum(summary.values()) or 1
+    pos   = summary["Positive"] / total * 100
+    neg   = summary["Negative"] / total * 100
+    neu   = summary["Neutral"]  / total * 100
+    bias  = 1 if pos - neg >= 20 else -1 if neg - pos >= 20 else 0
+    return pos, neg, neu, bias
+
+def clear_sentiment_cache():
+    """Forget per-run results (daemon mode calls this every bar)."""
+    _sentiment_cache.clear()
+
 def analyze_sentiment(symbol: str, force: bool = False):
     """
     Runs FinBERT on latest news headlines.
-    Cached per symbol per run.
+    Cached per symbol per run; per-headline labels persist on disk,
+    so only headlines not seen before are scored.
     Returns (positive%, negative%, neutral%, net_bias)
     net_bias: +1 bullish | -1 bearish | 0 neutral
     """
     if symbol in _sentiment_cache and not force:
+        count("cache.sentiment_hit")
         return _sentiment_cache[symbol]
 
-    query   = "gold price forecast" if symbol == "XAU/USD" else symbol
+    query   = get_instrument(symbol).query
     rss_url = f"https://news.google.com/rss/search?q={quote(query)}"
+    count("http.rss")
     feed    = feedparser.parse(rss_url)
     titles  = [e.title for e in feed.entries[:15]]
 
-    summary = {"Positive": 0, "Negative": 0, "Neutral": 0}
-    for title in titles:
-        inputs = tokenizer(title, return_tensors="pt",
-                           truncation=True, max_length=256)
-        with torch.no_grad():
-            outputs = model(**inputs)
-        probs = torch.softmax(outputs.logits, dim=1).numpy()[0]
-        summary[labels[probs.argmax()]] += 1
+    cache  = headline_cache()
+    known  = {title: cache.get(title) for title in dict.fromkeys(titles)}
+    unseen = [title for title, label in known.items() if label is None]
+    for title, label in zip(unseen, score_headlines(unseen)):
+        cache.put(title, label)
+        known[title] = label
+    cache.save()
 
-    total = sum(summary.values()) or 1
-    pos   = summary["Positive"] / total * 100
-    neg   = summary["Negative"] / total * 100
-    neu   = summary["Neutral"]  / total * 100
-    bias  = 1 if pos - neg >= 20 else -1 if neg - pos >= 20 else 0
+    stats = cache.stats()
+    print(f"[INFO] Sentiment cache {symbol}: {stats['hits']} hits / "
+          f"{stats['misses']} misses ({stats['hit_rate']}%)")
 
-    result = (pos, neg, neu, bias)
+    result = summarize_labels([known[title] for title in titles])
     _sentiment_cache[symbol] = result
     return result
@@ -0,0 +1,170 @@
+import argparse
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pandas as pd
+from align import INTERVALS
+from helpers import fetch_data, key_scheduler, FETCH_WORKERS
+from instruments import SYMBOLS
+from store import CandleStore
+from telemetry import instrumented, span, count
+
+# ──────────────────────────────
+# CONFIG
+# ──────────────────────────────
+PAGE_SIZE      = 5000       # Twelve Data outputsize cap
+HISTORY_YEARS  = float(os.getenv("HISTORY_YEARS", "3"))
+HISTORY_FLUSH  = int(os.getenv("HISTORY_FLUSH", "8"))      # pages per archive write
+HISTORY_ROUNDS = int(os.getenv("HISTORY_ROUNDS", "3"))     # retries of failed pages
+EPOCH          = pd.Timestamp(0, tz="UTC")
+INTERVALS_USED = ("1h", "1day", "1week")   # what backtest.py reads
+
+# ──────────────────────────────
+# PAGES
+# ──────────────────────────────
+def plan_pages(interval: str, start: pd.Timestamp, end: pd.Timestamp,
+               page_size: int = PAGE_SIZE) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+    """
+    (page_start, page_end) windows of page_size bars covering
+    [start, end], newest first. Boundaries sit on multiples of the
+    window length since the epoch, so a rerun plans the same pages
+    and can skip the ones already archived.
+    """
+    width = INTERVALS[interval] * page_size
+    first = (start - EPOCH) // width
+    last  = -(-(end - EPOCH) // width)
+    return [(EPOCH + k * width, EPOCH + (k + 1) * width)
+            for k in range(last - 1, first - 1, -1)]
+
+class PageLog:
+    """
+    Finished pages of one (symbol, interval), as JSON next to the
+    archive. Pages are only logged after their bars are written, so
+    an interrupted download resumes with nothing lost or repeated.
+    """
+
+    def __init__(self, root: str, symbol: str, interval: str):
+        self.path = os.path.join(root, "_pages",
+                                 f"{symbol.replace('/', '_')}_{interval}.json")
+        try:
+            with open(self.path) as f:
+                self.done = set(json.load(f))
+        except (OSError, ValueError):
+            self.done = set()
+
+    @staticmethod
+    def _key(page: tuple) -> str:
+        return page[0].isoformat()
+
+    def __contains__(self, page: tuple) -> bool:
+        return self._key(page) in self.done
+
+    def mark(self, pages: list[tuple]):
+        self.done.update(self._key(p) for p in pages)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(sorted(self.done), f)
+        os.replace(tmp, self.path)
+
+# ──────────────────────────────
+# DOWNLOAD
+# ──────────────────────────────
+def download(symbol: str, interval: str, start: pd.Timestamp,
+             end: pd.Timestamp | None = None, store: CandleStore | None = None,
+             workers: int = FETCH_WORKERS, flush_every: int = HISTORY_FLUSH,
+             rounds: int = HISTORY_ROUNDS) -> dict:
+    """
+    Archives [start, end] of one symbol/interval into the candle
+    store, PAGE_SIZE bars per request, `workers` requests at a time.
+    KeyScheduler spreads them over the key quotas (waiting out minute
+    windows); pages that still fail are retried for `rounds` passes
+    and otherwise left for the next run. Overlapping bars are merged
+    by CandleStore.write. The page holding `now` is never logged as
+    done, so reruns also top up the newest bars.
+    Returns {"pages", "skipped", "fetched", "failed", "bars"} where
+    bars is the archive size afterwards.
+    """
+    store = store or CandleStore()
+    log   = PageLog(store.root, symbol, interval)
+    now   = pd.Timestamp.now(tz="UTC")
+    end   = min(end or now, now)
+    pages = plan_pages(interval, start, end)
+    todo  = [p for p in pages if p not in log]
+    stats = {"pages": len(pages), "skipped": len(pages) - len(todo),
+             "fetched": 0, "failed": 0, "bars": 0}
+
+    frames, finished = [], []
+
+    def flush():
+        if frames:
+            with span("archive_write", symbol):
+                store.write(symbol, interval, pd.concat(frames))
+        log.mark([p for p in finished if p[1] <= now])
+        frames.clear()
+        finished.clear()
+
+    pool = ThreadPoolExecutor(max_workers=max(1, min(workers, len(todo))))
+    try:
+        for _ in range(rounds):
+            if not todo:
+                break
+            futures = {pool.submit(fetch_data, symbol, interval, PAGE_SIZE,
+                                   30, lo, hi): (lo, hi)
+                       for lo, hi in todo}
+            todo = []
+            for future in as_completed(futures):
+                page = futures[future]
+                df   = future.result()
+                if df is None:
+                    todo.append(page)
+                    continue
+                count("history.pages")
+                stats["fetched"] += 1
+                if len(df):
+                    frames.append(df)
+                finished.append(page)
+                if len(finished) >= flush_every:
+                    flush()
+            if todo and not any(key_scheduler().remaining().values()):
+                print("[WARN] Twelve Data credits exhausted — rerun to resume")
+                break
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        flush()
+        key_scheduler().save()
+
+    archive = store.read(symbol, interval)
+    stats["failed"] = len(todo)
+    stats["bars"]   = 0 if archive is None else len(archive)
+    return stats
+
+# ──────────────────────────────
+# MAIN
+# ──────────────────────────────
+def main():
+    parser = argparse.ArgumentParser(description="Bulk Twelve Data history into the candle store")
+    parser.add_argument("--symbol", action="append", help="repeatable; default WATCHLIST")
+    parser.add_argument("--interval", action="append",
+                        help="repeatable, e.g. 15min; default 1h, 1day, 1week")
+    parser.add_argument("--years", type=float, default=HISTORY_YEARS)
+    parser.add_argument("--start", help="UTC date, overrides --years")
+    parser.add_argument("--end", help="UTC date, default now")
+    parser.add_argument("--workers", type=int, default=FETCH_WORKERS)
+    args = parser.parse_args()
+
+    end   = pd.Timestamp(args.end, tz="UTC") if args.end else None
+    start = pd.Timestamp(args.start, tz="UTC") if args.start else \
+            pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=round(args.years * 365.25))
+
+    with instrumented("history"):
+        for symbol in args.symbol or SYMBOLS:
+            for interval in args.interval or INTERVALS_USED:
+                with span("download", symbol):
+                    stats = download(symbol, interval, start, end, workers=args.workers)
+                print(f"[INFO] {symbol} {interval}: {stats['fetched']} pages fetched, "
+                      f"{stats['skipped']} already archived, {stats['failed']} failed; "
+                      f"{stats['bars']} bars stored")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import copy
+import json
+import math
+import os
+from collections import deque
+import pandas as pd
+
+INDICATOR_STATE = os.getenv("INDICATOR_STATE")
+
+# ── Streaming indicators ──────────────────────────────
+# Each class mirrors its helpers.py counterpart bar by bar:
+# update(bar) commits one closed bar and returns the latest value
+# (NaN during warm-up, like the pandas min_periods).
+
+class _EWM:
+    """pandas ewm(adjust=False) recursion for one stream."""
+
+    def __init__(self, alpha: float, min_periods: int = 0):
+        self.alpha       = alpha
+        self.min_periods = min_periods
+        self.value       = math.nan
+        self.nobs        = 0
+
+    def update(self, x: float) -> float:
+        if x == x:
+            self.nobs += 1
+            if self.value != self.value:
+                self.value = x
+            elif self.value != x:
+                old_wt = 1. - self.alpha
+                self.value = (old_wt * self.value + self.alpha * x) \
+                             / (old_wt + self.alpha)
+        return self.value if self.nobs >= max(self.min_periods, 1) else math.nan
+
+class RSI:
+    """Wilder's smoothed RSI."""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.prev   = math.nan
+        self.gain   = _EWM(1 / period, period)
+        self.loss   = _EWM(1 / period, period)
+
+    def update(self, bar) -> float:
+        delta     = bar["close"] - self.prev
+        self.prev = bar["close"]
+        avg_gain  = self.gain.update(max(delta, 0.) if delta == delta else delta)
+        avg_loss  = self.loss.update(-min(delta, 0.) if delta == delta else delta)
+        if avg_gain != avg_gain or avg_loss != avg_loss:
+            return math.nan
+        rs = avg_gain / (avg_loss or math.inf)
+        return 100 - (100 / (1 + rs))
+
+class ATR:
+    """Average True Range."""
+
+    def __init__(self, period: int = 14):
+        self.period     = period
+        self.prev_close = math.nan
+        self.ewm        = _EWM(1 / period, period)
+
+    def update(self, bar) -> float:
+        high, low = bar["high"], bar["low"]
+        tr = high - low
+        if self.prev_close == self.prev_close:
+            tr = max(tr, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = bar["close"]
+        return self.ewm.update(tr)
+
+class EMA:
+    """Exponential Moving Average."""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.ewm    = _EWM(2 / (period + 1))
+
+    def update(self, bar) -> float:
+        return self.ewm.update(bar["close"])
+
+class BollingerBands:
+    """
+    Rolling BB from a running sum and sum of squares.
+    The sums are rebuilt from the window once per period so
+    add/remove rounding cannot drift over long streams.
+    """
+
+    def __init__(self, period: int = 20, std_dev: float = 2):
+        self.period  = period
+        self.std_dev = std_dev
+        self.window  = deque()
+        self.total   = 0.
+        self.squares = 0.
+        self.seen    = 0
+
+    def update(self, bar) -> tuple[float, float, float]:
+        x = bar["close"]
+        self.window.append(x)
+        self.total   += x
+        self.squares += x * x
+        if len(self.window) > self.period:
+            old = self.window.popleft()
+            self.total   -= old
+            self.squares -= old * old
+        self.seen += 1
+        if self.seen % self.period == 0:
+            self.total   = math.fsum(self.window)
+            self.squares = math.fsum(v * v for v in self.window)
+        if len(self.window) < self.period:
+            return math.nan, math.nan, math.nan
+        sma = self.total / self.period
+        std = math.sqrt(max(self.squares / self.period - sma * sma, 0.))
+        return sma + self.std_dev * std, sma, sma - self.std_dev * std
+
+# ── Engine + snapshot ─────────────────────────────────
+class IndicatorEngine:
+    """
+    RSI / BB / ATR / EMA20 for one symbol + interval, fed only the
+    bars it has not seen yet. State round-trips through to_dict()
+    so a cron run can resume where the previous one stopped.
+    """
+
+    def __init__(self, rsi_period: int = 14, bb_period: int = 20,
+                 bb_stddev: float = 2, atr_period: int = 14):
+        self.rsi       = RSI(rsi_period)
+        self.bb        = BollingerBands(bb_period, bb_stddev)
+        self.atr       = ATR(atr_period)
+        self.ema20     = EMA(20)
+        self.last_time = None
+
+    def update(self, bar) -> dict:
+        """Commits one closed bar; returns its indicator values."""
+        upper, mid, lower = self.bb.update(bar)
+        values = {
+            "rsi":      self.rsi.update(bar),
+            "bb_upper": upper,
+            "bb_mid":   mid,
+            "bb_lower": lower,
+            "atr":      self.atr.update(bar),
+            "ema20":    self.ema20.update(bar),
+        }
+        if "datetime" in bar:
+            self.last_time = pd.Timestamp(bar["datetime"])
+        return values
+
+    def peek(self, bar) -> dict:
+        """Values for a still-forming bar, without committing it."""
+        return copy.deepcopy(self).update(bar)
+
+    def annotate(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Writes indicator columns onto df: every closed bar newer than
+        the snapshot is committed, the last (forming) bar is peeked.
+        Bars the engine saw in an earlier run stay NaN. If the
+        snapshot no longer overlaps df the engine restarts from df.
+        """
+        if self.last_time is not None and \
+                (df.empty or df["datetime"].iloc[0] > self.last_time):
+            self.__init__(self.rsi.period, self.bb.period,
+                          self.bb.std_dev, self.atr.period)
+
+        rows = {}
+        for i, bar in enumerate(df.to_dict("records")):
+            if self.last_time is not None and bar["datetime"] <= self.last_time:
+                continue
+            rows[i] = self.peek(bar) if i == len(df) - 1 else self.update(bar)
+
+        values = pd.DataFrame.from_dict(rows, orient="index")
+        for col in ("rsi", "bb_upper", "bb_mid", "bb_lower", "atr", "ema20"):
+            df[col] = values[col].reindex(range(len(df))).to_numpy() \
+                      if col in values else math.nan
+        return df
+
+    def to_dict(self) -> dict:
+        state = {name: _dump(getattr(self, name))
+                 for name in ("rsi", "bb", "atr", "ema20")}
+        state["last_time"] = self.last_time.isoformat() if self.last_time else None
+        return state
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "IndicatorEngine":
+        engine = cls(state["rsi"]["period"], state["bb"]["period"],
+                     state["bb"]["std_dev"], state["atr"]["period"])
+        for name in ("rsi", "bb", "atr", "ema20"):
+            _restore(getattr(engine, name), state[name])
+        if state["last_time"]:
+            engine.last_time = pd.Timestamp(state["last_time"])
+        return engine
+
+def _dump(obj):
+    if isinstance(obj, deque):
+        return list(obj)
+    if hasattr(obj, "__dict__"):
+        return {key: _dump(value) for key, value in vars(obj).items()}
+    return obj
+
+def _restore(obj, state: dict):
+    for key, value in state.items():
+        current = getattr(obj, key)
+        if isinstance(current, deque):
+            setattr(obj, key, deque(value))
+        elif hasattr(current, "__dict__"):
+            _restore(current, value)
+        else:
+            setattr(obj, key, value)
+
+def load_engines(path: str = INDICATOR_STATE) -> dict:
+    """{"XAU/USD|1h": IndicatorEngine} from the snapshot file, if any."""
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {key: IndicatorEngine.from_dict(state)
+                for key, state in json.load(f).items()}
+
+def save_engines(engines: dict, path: str = INDICATOR_STATE):
+    if not path:
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({key: engine.to_dict() for key, engine in engines.items()}, f)
+    os.replace(tmp, path)
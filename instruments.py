@@ -0,0 +1,69 @@
+import os
+import json
+from dataclasses import dataclass, replace
+import numpy as np
+
+WATCHLIST        = os.getenv("WATCHLIST", "XAU/USD")
+INSTRUMENTS_FILE = os.getenv("INSTRUMENTS_FILE")
+DEFAULT_SYMBOL   = "XAU/USD"
+
+@dataclass(frozen=True)
+class Instrument:
+    """
+    Per-symbol settings. Price filters only affect swing / weekly
+    structure, never indicator inputs. Threshold fields left as None
+    fall back to the strategy.py constants; decimals left as None
+    follows the quotes' own precision (for_prices).
+    """
+    symbol:         str
+    min_low:        float = 0.0      # drops zero / bad-tick lows
+    min_range:      float = 0.0      # drops flat candles from swing stats
+    news_query:     str | None = None
+    decimals:       int | None = None  # SL / TP rounding
+    min_body_ratio: float | None = None
+    sl_multiplier:  float | None = None
+    tp_multiplier:  float | None = None
+
+    @property
+    def query(self) -> str:
+        return self.news_query or self.symbol
+
+    def for_prices(self, prices) -> "Instrument":
+        """Self, with decimals read off `prices` when none is registered."""
+        if self.decimals is not None:
+            return self
+        return replace(self, decimals=price_decimals(prices))
+
+def price_decimals(prices, limit: int = 8) -> int:
+    """Quote precision: the fewest decimals that reproduce every price."""
+    p = np.asarray(prices, float)
+    p = p[np.isfinite(p)]
+    for k in range(limit):
+        if np.allclose(np.round(p, k), p, rtol=1e-12, atol=0):
+            return k
+    return limit
+
+INSTRUMENTS = {
+    "XAU/USD": Instrument("XAU/USD", min_low=100, min_range=1.0, decimals=2,
+                          news_query="gold price forecast"),
+}
+
+def _load_file(path: str | None):
+    """Merges {"EUR/USD": {"min_range": 0.0005, ...}} into INSTRUMENTS."""
+    if not path or not os.path.exists(path):
+        return
+    with open(path) as f:
+        for symbol, fields in json.load(f).items():
+            base = INSTRUMENTS.get(symbol, Instrument(symbol))
+            INSTRUMENTS[symbol] = replace(base, **fields)
+
+_load_file(INSTRUMENTS_FILE)
+
+def get_instrument(symbol: str) -> Instrument:
+    """
+    Registered settings, or filter-free defaults for unknown symbols
+    (SL / TP then rounded to the quotes' precision, not gold's cents).
+    """
+    return INSTRUMENTS.get(symbol) or Instrument(symbol)
+
+SYMBOLS = [s.strip() for s in WATCHLIST.split(",") if s.strip()]
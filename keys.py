@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+TD_CREDITS_PER_MIN = int(os.getenv("TD_CREDITS_PER_MIN", "8"))
+TD_CREDITS_PER_DAY = int(os.getenv("TD_CREDITS_PER_DAY", "800"))
+KEY_USAGE_FILE     = os.getenv("KEY_USAGE_FILE", ".state/key_usage.json")
+
+class KeyScheduler:
+    """
+    Spreads Twelve Data calls over TD_API_KEYS.
+    Tracks credits per key per minute and per UTC day, hands out the
+    least-used key that still has credit, and parks keys that hit a
+    429 until their window resets. Counters persist in a JSON file
+    so consecutive cron runs share the same budget; the file is
+    keyed by key_id, never the key itself, since CI caches it.
+    """
+
+    def __init__(self, keys: list[str],
+                 per_minute: int = TD_CREDITS_PER_MIN,
+                 per_day: int = TD_CREDITS_PER_DAY,
+                 path: str | None = KEY_USAGE_FILE):
+        self.keys       = [k.strip() for k in keys if k.strip()]
+        self.per_minute = per_minute
+        self.per_day    = per_day
+        self.path       = path
+        self._lock      = threading.Lock()
+        self.usage      = {key: {"minute": 0, "minute_used": 0,
+                                 "day": 0, "day_used": 0, "parked_until": 0}
+                           for key in self.keys}
+        self._load()
+
+    # ── Persistence ─────────────────────────────────
+    @staticmethod
+    def key_id(key: str) -> str:
+        """Short stable digest standing in for an API key on disk."""
+        return hashlib.sha256(key.encode()).hexdigest()[:12]
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        for key in self.keys:
+            # raw-key entries come from older files; save() rewrites them
+            usage = saved.get(self.key_id(key)) or saved.get(key)
+            if usage:
+                self.usage[key].update(usage)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            snapshot = json.dumps({self.key_id(key): usage
+                                   for key, usage in self.usage.items()})
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(snapshot)
+        os.replace(tmp, self.path)
+
+    # ── Scheduling ──────────────────────────────────
+    def _roll(self, usage: dict, now: float):
+        minute, day = int(now // 60), int(now // 86400)
+        if usage["minute"] != minute:
+            usage["minute"], usage["minute_used"] = minute, 0
+        if usage["day"] != day:
+            usage["day"], usage["day_used"] = day, 0
+
+    def _available(self, usage: dict, now: float, cost: int) -> bool:
+        return (usage["parked_until"] <= now
+                and usage["minute_used"] + cost <= self.per_minute
+                and usage["day_used"] + cost <= self.per_day)
+
+    def acquire(self, cost: int = 1, max_wait: float = 0) -> str | None:
+        """
+        Reserves `cost` credits on the least-used available key.
+        Waits up to `max_wait` seconds for a minute window to reset;
+        None when every key is out of credit.
+        """
+        deadline = time.time() + max_wait
+        while True:
+            with self._lock:
+                now = time.time()
+                for usage in self.usage.values():
+                    self._roll(usage, now)
+                ready = [k for k, u in self.usage.items()
+                         if self._available(u, now, cost)]
+                if ready:
+                    key = min(ready, key=lambda k: (self.usage[k]["minute_used"],
+                                                    self.usage[k]["day_used"]))
+                    self.usage[key]["minute_used"] += cost
+                    self.usage[key]["day_used"]    += cost
+                    return key
+                wake = min((self._next_reset(u, now) for u in self.usage.values()),
+                           default=None)
+            if wake is None or wake > deadline:
+                return None
+            time.sleep(max(wake - time.time(), 0.05))
+
+    def _next_reset(self, usage: dict, now: float) -> float:
+        if usage["day_used"] >= self.per_day:
+            return (int(now // 86400) + 1) * 86400
+        return max(usage["parked_until"], (int(now // 60) + 1) * 60)
+
+    def park(self, key: str, daily: bool = False):
+        """Rate-limited (429): bench the key until its window resets."""
+        with self._lock:
+            now   = time.time()
+            until = (int(now // 86400) + 1) * 86400 if daily \
+                    else (int(now // 60) + 1) * 60
+            self.usage[key]["parked_until"] = until
+            if daily:
+                self.usage[key]["day_used"] = self.per_day
+
+    def remaining(self) -> dict:
+        """Credits left today per key."""
+        with self._lock:
+            now = time.time()
+            for usage in self.usage.values():
+                self._roll(usage, now)
+            return {key: self.per_day - u["day_used"] for key, u in self.usage.items()}
@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+
+# One row per trade, in simulate_trades' dict key order. Times are
+# UTC nanoseconds; an OPEN trade has NaN / NaT exit fields.
+TRADE_DTYPE = np.dtype([
+    ("symbol",     "U16"),
+    ("direction",  "U4"),
+    ("type",       "U8"),
+    ("entry",      "f8"),
+    ("sl",         "f8"),
+    ("tp",         "f8"),
+    ("entry_time", "M8[ns]"),
+    ("exit",       "f8"),
+    ("exit_time",  "M8[ns]"),
+    ("result",     "U4"),
+    ("pnl_pips",   "f8"),
+    ("pnl_dollar", "f8"),
+    ("equity",     "f8"),
+])
+TIME_FIELDS = ("entry_time", "exit_time")
+OPEN_NONE   = ("exit", "exit_time", "pnl_pips", "pnl_dollar")   # None on OPEN rows
+
+def _stamp(value) -> np.datetime64:
+    if value is None or value is pd.NaT:
+        return np.datetime64("NaT", "ns")
+    ts = pd.Timestamp(value)
+    return np.datetime64(ts.tz_convert("UTC").tz_localize(None) if ts.tz else ts, "ns")
+
+class TradeLedger:
+    """
+    Array-backed trade list: one structured NumPy array, grown by
+    doubling. ledger["pnl_dollar"] is a column view; ledger[i] and
+    iteration give the trade dicts simulate_trades used to return,
+    so list-of-dict callers keep working.
+    """
+
+    def __init__(self, rows: np.ndarray | None = None, capacity: int = 16):
+        if rows is None:
+            self._rows, self._n = np.empty(capacity, TRADE_DTYPE), 0
+        else:
+            self._rows, self._n = rows, len(rows)
+
+    @classmethod
+    def from_records(cls, trades) -> "TradeLedger":
+        """Ledger from trade dicts (or another ledger, returned as is)."""
+        if isinstance(trades, cls):
+            return trades
+        ledger = cls(capacity=max(len(trades), 1))
+        for trade in trades:
+            ledger.append(trade)
+        return ledger
+
+    @classmethod
+    def concat(cls, ledgers: list["TradeLedger"]) -> "TradeLedger":
+        return cls(np.concatenate([l.rows for l in ledgers]) if ledgers
+                   else np.empty(0, TRADE_DTYPE))
+
+    def append(self, trade: dict):
+        if self._n == len(self._rows):
+            grown = np.empty(max(2 * self._n, 16), TRADE_DTYPE)
+            grown[:self._n] = self._rows[:self._n]
+            self._rows = grown
+        self._rows[self._n] = tuple(
+            _stamp(trade.get(name)) if name in TIME_FIELDS else
+            np.nan if trade.get(name) is None and TRADE_DTYPE[name].kind == "f" else
+            trade.get(name, "")
+            for name in TRADE_DTYPE.names
+        )
+        self._n += 1
+
+    @property
+    def rows(self) -> np.ndarray:
+        return self._rows[:self._n]
+
+    @property
+    def is_closed(self) -> np.ndarray:
+        return self.rows["result"] != "OPEN"
+
+    def closed(self) -> "TradeLedger":
+        return TradeLedger(self.rows[self.is_closed])
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.rows[key]
+        if isinstance(key, slice):
+            return TradeLedger(self.rows[key])
+        return self._record(self.rows[key])
+
+    def __iter__(self):
+        return (self._record(row) for row in self.rows)
+
+    @staticmethod
+    def _record(row) -> dict:
+        trade = {}
+        for name in TRADE_DTYPE.names:
+            value = row[name]
+            if name in TIME_FIELDS:
+                value = None if np.isnat(value) else pd.Timestamp(value, tz="UTC")
+            elif TRADE_DTYPE[name].kind == "f":
+                value = float(value)
+            else:
+                value = str(value)
+            trade[name] = value
+        if trade["result"] == "OPEN":
+            trade.update(dict.fromkeys(OPEN_NONE))
+        return trade
+
+    def to_frame(self) -> pd.DataFrame:
+        df = pd.DataFrame(self.rows)
+        for name in TIME_FIELDS:
+            df[name] = df[name].dt.tz_localize("UTC")
+        return df
+
+    def to_parquet(self, path: str):
+        """Needs pyarrow (or fastparquet), as pandas.to_parquet does."""
+        self.to_frame().to_parquet(path, index=False)
@@ -1,68 +1,201 @@
 import os
+import time
 from datetime import datetime, timezone, timedelta
-from helpers import fetch_data, analyze_sentiment, send_alert
-from strategy import generate_signal, SYMBOLS
-from state import get_last_signal, set_last_signal
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from helpers import analyze_sentiment, clear_sentiment_cache, send_alert, alert_batch, \
+                    flush_alerts
+from store import fetch_cached_many
+from strategy import generate_signal, sentiment_blocks, SYMBOLS
+from instruments import get_instrument
+from state import get_last_signal, set_last_signal, sync_state
+from incremental import INDICATOR_STATE, IndicatorEngine, load_engines, save_engines
+from telemetry import instrumented, span
 
 WAT = timezone(timedelta(hours=1))
 
-def main():
-    run_mode = os.getenv("RUN_MODE", "normal")
-    now_wat  = datetime.now(WAT)
+DAILY_BRIEFING_HOUR = int(os.getenv("DAILY_BRIEFING_HOUR", "1"))      # WAT
+BAR_CLOSE_DELAY     = float(os.getenv("BAR_CLOSE_DELAY", "20"))       # seconds
+PIPELINE_WORKERS    = int(os.getenv("PIPELINE_WORKERS", "8"))
 
-    for symbol in SYMBOLS:
-        df_1h = fetch_data(symbol, "1h",    100)
-        df_1d = fetch_data(symbol, "1day",  50)
-        df_1w = fetch_data(symbol, "1week", 20)
+def evaluate(symbol: str, frames: dict, run_mode: str,
+             engines: dict | None, now_wat: datetime, closed_only: bool = False):
+    """
+    signal → sentiment → state for one symbol, each stage a span.
+    Returns the alert message (None when there is nothing to send);
+    run() sends them so the batch keeps SYMBOLS order.
+    """
+    instrument = get_instrument(symbol)
+    df_1h = frames[(symbol, "1h")]
+    df_1d = frames[(symbol, "1day")]
+    df_1w = frames[(symbol, "1week")]
 
-        if df_1h is None or df_1d is None:
-            print(f"[WARN] No data for {symbol}, skipping.")
-            continue
+    if df_1h is None or df_1d is None:
+        print(f"[WARN] No data for {symbol}, skipping.")
+        return
 
-        pos, neg, neu, bias = analyze_sentiment(symbol)
+    if closed_only:
+        bar_open = pd.Timestamp.now(tz="UTC").floor("h")
+        df_1h    = df_1h[df_1h["datetime"] < bar_open].reset_index(drop=True)
 
-        signal, last1h, sig_type, sl, tp = generate_signal(
-            df_1h, df_1d, df_1w, bias
-        )
-        current_signal = f"{signal}_{sig_type}" if signal and sig_type else None
+    if engines is not None:
+        with span("indicators", symbol):
+            engines.setdefault(f"{symbol}|1h", IndicatorEngine()).annotate(df_1h)
 
-        # ── NORMAL MODE ─────────────────────────────
-        if run_mode == "normal":
-            if not current_signal:
-                continue
+    # Technical signal first — FinBERT only loads when it can matter
+    with span("signal", symbol):
+        signal, last1h, sig_type, sl, tp = generate_signal(df_1h, df_1d, df_1w,
+                                                           instrument=instrument)
+    current_signal = f"{signal}_{sig_type}" if signal and sig_type else None
+
+    # ── NORMAL MODE ─────────────────────────────
+    if run_mode == "normal":
+        if not current_signal:
+            return
+        with span("state", symbol):
             if current_signal == get_last_signal(symbol):
-                continue
+                return
+
+        with span("sentiment", symbol):
+            pos, neg, neu, bias = analyze_sentiment(symbol)
+        if sentiment_blocks(signal, bias):
+            return
+
+        rr = round((tp - last1h["close"]) / (last1h["close"] - sl), 2) \
+             if signal == "BUY" else \
+             round((last1h["close"] - tp) / (sl - last1h["close"]), 2)
 
-            rr = round((tp - last1h["close"]) / (last1h["close"] - sl), 2) \
-                 if signal == "BUY" else \
-                 round((last1h["close"] - tp) / (sl - last1h["close"]), 2)
-
-            msg = (
-                f"📊 <b>{symbol} Signal Alert</b>\n"
-                f"Signal : {signal} ({sig_type})\n"
-                f"Close  : {last1h['close']:.4f}\n"
-                f"RSI    : {last1h['rsi']:.2f}\n"
-                f"SL     : {sl} | TP: {tp}\n"
-                f"R:R    : 1:{rr}\n"
-                f"News   : 🟢 {pos:.1f}% | 🔴 {neg:.1f}% | ⚪ {neu:.1f}%\n"
-                f"Time   : {now_wat.strftime('%Y-%m-%d %H:%M')} WAT"
-            )
-            send_alert(msg)
+        msg = (
+            f"📊 <b>{symbol} Signal Alert</b>\n"
+            f"Signal : {signal} ({sig_type})\n"
+            f"Close  : {last1h['close']:.4f}\n"
+            f"RSI    : {last1h['rsi']:.2f}\n"
+            f"SL     : {sl} | TP: {tp}\n"
+            f"R:R    : 1:{rr}\n"
+            f"News   : 🟢 {pos:.1f}% | 🔴 {neg:.1f}% | ⚪ {neu:.1f}%\n"
+            f"Time   : {now_wat.strftime('%Y-%m-%d %H:%M')} WAT"
+        )
+        with span("state", symbol):
             set_last_signal(symbol, current_signal)
+        return msg
+
+    # ── DAILY MODE ──────────────────────────────
+    elif run_mode == "daily":
+        with span("sentiment", symbol):
+            pos, neg, neu, bias = analyze_sentiment(symbol)
+        if sentiment_blocks(signal, bias):
+            signal, sig_type, sl, tp = None, None, None, None
+        sl_str = f" | SL: {sl} TP: {tp}" if signal else ""
+        msg = (
+            f"⏰ <b>{symbol} — Daily Briefing</b>\n"
+            f"Signal : {signal if signal else 'No clear signal'}"
+            + (f" ({sig_type})" if sig_type else "") + sl_str + "\n"
+            f"Close  : {last1h['close']:.4f}\n"
+            f"RSI    : {last1h['rsi']:.2f}\n"
+            f"News   : 🟢 {pos:.1f}% | 🔴 {neg:.1f}% | ⚪ {neu:.1f}%\n"
+            f"Date   : {now_wat.strftime('%Y-%m-%d')} WAT"
+        )
+        return msg
+
+def run(run_mode: str, engines: dict | None = None,
+        closed_only: bool = False):
+    """
+    One evaluation pass over SYMBOLS.
+    Candles for every symbol come in one pooled batch, then each
+    symbol's pipeline runs on a PIPELINE_WORKERS thread pool.
+    closed_only drops the bar that is still forming, so a pass fired
+    right after a close judges the candle that just completed.
+    """
+    now_wat  = datetime.now(WAT)
+    with span("fetch"):
+        frames = fetch_cached_many([
+            (symbol, interval, limit)
+            for symbol in SYMBOLS
+            for interval, limit in (("1h", 100), ("1day", 50), ("1week", 20))
+        ])
+
+    # One coalesced Telegram message per run, however many symbols fire.
+    # Messages are queued in SYMBOLS order, whichever pipeline ends first.
+    with alert_batch(), ThreadPoolExecutor(max_workers=PIPELINE_WORKERS) as pool:
+        futures = [(symbol, pool.submit(evaluate, symbol, frames, run_mode, engines,
+                                        now_wat, closed_only))
+                   for symbol in SYMBOLS]
+        for symbol, future in futures:
+            try:
+                msg = future.result()
+            except Exception as e:
+                print(f"[ERROR] {symbol} pipeline failed: {e}")
+                continue
+            if msg:
+                with span("alert", symbol):
+                    send_alert(msg)
+
+def next_bar_close(now: datetime) -> datetime:
+    """Next top of the hour (1h bar close) plus BAR_CLOSE_DELAY."""
+    hour = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    return hour + timedelta(seconds=BAR_CLOSE_DELAY)
+
+def run_daemon():
+    """
+    RUN_MODE=daemon: one long-lived process instead of a cron cold
+    start. Sleeps until just after each 1h bar close, evaluates the
+    closed candle and sends the daily briefing at DAILY_BRIEFING_HOUR
+    WAT. FinBERT, the HTTP session, sheet state and indicator engines
+    stay warm between bars; signal state syncs to the sheet after
+    every pass. Each pass emits its own telemetry line.
+    """
+    engines       = load_engines() if INDICATOR_STATE else None
+    last_briefing = None
+    print("[INFO] Daemon started")
+
+    while True:
+        now  = datetime.now(timezone.utc)
+        wake = next_bar_close(now)
+        time.sleep(max((wake - now).total_seconds(), 0))
+
+        clear_sentiment_cache()
+        with instrumented("daemon"):
+            try:
+                run("normal", engines, closed_only=True)
+                now_wat = datetime.now(WAT)
+                if now_wat.hour == DAILY_BRIEFING_HOUR and last_briefing != now_wat.date():
+                    run("daily", engines, closed_only=True)
+                    last_briefing = now_wat.date()
+            except Exception as e:
+                print(f"[ERROR] Daemon pass failed: {e}")
+
+            with span("deliver"):
+                flush_alerts(timeout=60)
+            try:
+                with span("sync"):
+                    sync_state()
+            except Exception as e:
+                print(f"[ERROR] State sync failed: {e}")
+            if engines is not None:
+                with span("save_engines"):
+                    save_engines(engines)
+
+def main():
+    run_mode = os.getenv("RUN_MODE", "normal")
+    if run_mode == "daemon":
+        run_daemon()
+        return
 
-        # ── DAILY MODE ──────────────────────────────
-        elif run_mode == "daily":
-            sl_str = f" | SL: {sl} TP: {tp}" if signal else ""
-            msg = (
-                f"⏰ <b>{symbol} — Daily Briefing</b>\n"
-                f"Signal : {signal if signal else 'No clear signal'}"
-                + (f" ({sig_type})" if sig_type else "") + sl_str + "\n"
-                f"Close  : {last1h['close']:.4f}\n"
-                f"RSI    : {last1h['rsi']:.2f}\n"
-                f"News   : 🟢 {pos:.1f}% | 🔴 {neg:.1f}% | ⚪ {neu:.1f}%\n"
-                f"Date   : {now_wat.strftime('%Y-%m-%d')} WAT"
-            )
-            send_alert(msg)
+    with instrumented(run_mode):
+        engines = load_engines() if INDICATOR_STATE else None
+        try:
+            run(run_mode, engines)
+            with span("deliver"):
+                flush_alerts(timeout=60)
+        finally:
+            # Alerts may already be out — record them even if the run failed
+            try:
+                with span("sync"):
+                    sync_state()
+            finally:
+                if engines is not None:
+                    with span("save_engines"):
+                        save_engines(engines)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,83 @@
+import os
+import numpy as np
+from ledger import TradeLedger
+
+# ──────────────────────────────
+# CONFIG
+# ──────────────────────────────
+MC_PATHS      = int(os.getenv("MC_PATHS", "10000"))
+MC_METHOD     = os.getenv("MC_METHOD", "bootstrap")    # bootstrap | shuffle
+MC_SEED       = int(os.getenv("MC_SEED", "0")) or None
+RUIN_DRAWDOWN = float(os.getenv("RUIN_DRAWDOWN", "50"))  # % drawdown counted as ruin
+MC_CHUNK      = 2_000_000      # path × trade cells per block, bounds memory
+
+def r_multiples(trades: TradeLedger | list[dict]) -> np.ndarray:
+    """
+    Closed-trade P&L in units of the initial risk (SL distance),
+    from the prices themselves rather than the rounded pnl_pips.
+    """
+    closed = TradeLedger.from_records(trades).closed()
+    sign   = np.where(closed["direction"] == "BUY", 1.0, -1.0)
+    pnl    = (closed["exit"] - closed["entry"]) * sign
+    risk   = np.abs(closed["entry"] - closed["sl"])
+    return np.divide(pnl, risk, out=np.zeros_like(pnl), where=risk > 0)
+
+def simulate_paths(r: np.ndarray, risk: float, paths: int = MC_PATHS,
+                   method: str = MC_METHOD,
+                   seed: int | None = MC_SEED) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (total return %, max drawdown %) for `paths` resampled trade
+    sequences, compounding `risk` of equity per trade like
+    simulate_trades. bootstrap draws trades with replacement;
+    shuffle permutes them, so only the path (drawdown) changes.
+    Paths are built in float32 2D blocks of at most MC_CHUNK cells.
+    """
+    if method not in ("bootstrap", "shuffle"):
+        raise ValueError(f"Unknown Monte Carlo method {method!r}")
+    rng    = np.random.default_rng(seed)
+    n      = len(r)
+    growth = (1 + risk * r).astype(np.float32)
+    block  = max(1, MC_CHUNK // max(n, 1))
+    rets   = np.empty(paths)
+    dds    = np.empty(paths)
+
+    for lo in range(0, paths, block):
+        hi = min(lo + block, paths)
+        if method == "bootstrap":
+            steps = growth[rng.integers(0, n, (hi - lo, n))]
+        else:
+            steps = rng.permuted(np.broadcast_to(growth, (hi - lo, n)), axis=1)
+        equity = np.cumprod(steps, axis=1, out=steps)
+        under  = np.maximum.accumulate(equity, axis=1)
+        np.maximum(under, 1.0, out=under)                 # peak incl. the start
+        np.divide(equity, under, out=under)               # equity / running peak
+        rets[lo:hi] = (equity[:, -1].astype(float) - 1) * 100
+        dds[lo:hi]  = (1 - under.min(axis=1)) * 100
+    return rets, dds
+
+def monte_carlo(trades: TradeLedger | list[dict], risk: float, paths: int = MC_PATHS,
+                method: str = MC_METHOD, seed: int | None = MC_SEED,
+                ruin: float = RUIN_DRAWDOWN) -> dict:
+    """
+    Tail-risk summary over resampled closed trades: drawdown
+    percentiles, 5–95% return interval and risk of ruin (share of
+    paths whose drawdown reaches `ruin` %). {} without closed trades.
+    """
+    r = r_multiples(trades)
+    if not len(r):
+        return {}
+    rets, dds = simulate_paths(r, risk, paths, method, seed)
+    dd50, dd95, dd99 = np.percentile(dds, [50, 95, 99])
+    ret5, ret50, ret95 = np.percentile(rets, [5, 50, 95])
+    return {
+        "paths":        paths,
+        "method":       method,
+        "dd_p50":       round(float(dd50), 1),
+        "dd_p95":       round(float(dd95), 1),
+        "dd_p99":       round(float(dd99), 1),
+        "return_p5":    round(float(ret5), 2),
+        "return_p50":   round(float(ret50), 2),
+        "return_p95":   round(float(ret95), 2),
+        "risk_of_ruin": round(float((dds >= ruin).mean() * 100), 2),
+        "ruin_dd":      ruin,
+    }
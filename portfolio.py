@@ -0,0 +1,209 @@
+import argparse
+import heapq
+import os
+from itertools import groupby, repeat
+import pandas as pd
+from backtest import (fetch_history, prepare_frames, in_sl_zone, settle_trade,
+                      calc_stats, build_report, INITIAL_EQUITY, RISK_PER_TRADE,
+                      SWING_WINDOW)
+from helpers import send_alert, flush_alerts
+from instruments import SYMBOLS
+from ledger import TradeLedger
+from montecarlo import monte_carlo
+from strategy import compute_signals, BB_PERIOD
+from telemetry import instrumented, span
+
+# ──────────────────────────────
+# CONFIG
+# ──────────────────────────────
+MAX_POSITIONS = int(os.getenv("PORTFOLIO_MAX_POSITIONS", "3"))   # open at once, all symbols
+
+# ──────────────────────────────
+# STREAMS
+# ──────────────────────────────
+class _Book:
+    """
+    One symbol's columns plus its trading state. The per-bar fields
+    (stamps, high, low, direction) are plain lists for the replay
+    loop; entry prices stay NumPy scalars so settle_trade rounds them
+    exactly as simulate_trades does.
+    """
+
+    def __init__(self, df_1h: pd.DataFrame, df_1d: pd.DataFrame,
+                 df_1w: pd.DataFrame | None, instrument):
+        instrument = instrument.for_prices(df_1h["close"])
+        sig = compute_signals(df_1h, df_1d, df_1w, swing_window=SWING_WINDOW,
+                              instrument=instrument)
+        self.symbol    = instrument.symbol
+        self.decimals  = instrument.decimals
+        self.times     = df_1h["datetime"]
+        self.stamps    = self.times.to_numpy("datetime64[ns]").view("int64").tolist()
+        self.high      = df_1h["high"].to_numpy(float).tolist()
+        self.low       = df_1h["low"].to_numpy(float).tolist()
+        self.close     = df_1h["close"].to_numpy(float)
+        self.atr       = df_1h["atr"].to_numpy(float)
+        self.direction = sig["direction"].where(sig["direction"].notna(), None).tolist()
+        self.type      = sig["signal_type"].tolist()
+        self.sl        = sig["sl"].to_numpy(float)
+        self.tp        = sig["tp"].to_numpy(float)
+        self.trade     = None
+        self.entry_bar = None
+        self.risk      = None                  # $ at risk, fixed when the trade opens
+        self.flat_from = BB_PERIOD + 1
+        self.sl_zones  = []
+
+    def bars(self, rank: int):
+        """(timestamp ns, rank, bar) per bar, already in time order."""
+        return zip(self.stamps, repeat(rank), range(len(self.stamps)))
+
+    def exit_hit(self, i: int) -> bool | None:
+        """hit_tp if bar i touches the open trade's SL or TP (TP wins ties), else None."""
+        t = self.trade
+        if t["direction"] == "BUY":
+            hit_sl, hit_tp = self.low[i] <= t["sl"], self.high[i] >= t["tp"]
+        else:
+            hit_sl, hit_tp = self.high[i] >= t["sl"], self.low[i] <= t["tp"]
+        return hit_tp if hit_sl or hit_tp else None
+
+# ──────────────────────────────
+# PORTFOLIO
+# ──────────────────────────────
+def simulate_portfolio(prepared: dict, max_positions: int = MAX_POSITIONS,
+                       initial_equity: float = INITIAL_EQUITY) -> tuple[TradeLedger, dict]:
+    """
+    simulate_trades across symbols against one shared equity.
+    prepared is {symbol: (df_1h, df_1d, df_1w, instrument)} as
+    prepare_frames returns it. Signals are computed per symbol in one
+    vectorized pass; the 1h bars of all symbols are then replayed in
+    timestamp order through a heapq k-way merge, so the work is
+    O(total bars · log symbols). At each timestamp exits are settled
+    first, then entries (in `prepared` order) open while fewer than
+    max_positions trades are open. Each entry risks RISK_PER_TRADE of
+    the equity realised so far, and its P&L is booked when it closes.
+    Per symbol the rules are simulate_trades': one trade at a time,
+    no re-entry on the exit bar, SL zones.
+    Returns (ledger in close order, {"bars", "peak_open", "capped"}),
+    where capped counts signals skipped because the cap was reached.
+    """
+    books  = [_Book(*frames) for frames in prepared.values()]
+    trades = TradeLedger()
+    equity = initial_equity
+    open_n = peak_open = capped = bars = 0
+
+    merged = heapq.merge(*(book.bars(rank) for rank, book in enumerate(books)))
+    for _, events in groupby(merged, key=lambda e: e[0]):
+        events = list(events)
+        bars  += len(events)
+
+        for _, rank, i in events:
+            book = books[rank]
+            if book.trade is None or i <= book.entry_bar:
+                continue
+            hit_tp = book.exit_hit(i)
+            if hit_tp is None:
+                continue
+            trade, book.trade = book.trade, None
+            equity = settle_trade(trade, hit_tp, book.times.iat[i], equity, book.risk,
+                                  book.decimals)
+            if trade["result"] == "SL":
+                book.sl_zones.append({"direction": trade["direction"],
+                                      "price": trade["exit"], "bar": i})
+            book.flat_from = i + 1
+            open_n -= 1
+            trades.append(trade)
+
+        for _, rank, i in events:
+            book      = books[rank]
+            direction = book.direction[i]
+            if direction is None or book.trade is not None or i < book.flat_from:
+                continue
+            book.sl_zones = [z for z in book.sl_zones if i - z["bar"] <= 30]
+            if in_sl_zone(book.close[i], direction, book.sl_zones, book.atr[i]):
+                continue
+            if open_n >= max_positions:
+                capped += 1
+                continue
+            book.trade = {
+                "symbol":     book.symbol,
+                "direction":  direction,
+                "type":       book.type[i],
+                "entry":      book.close[i],
+                "sl":         book.sl[i],
+                "tp":         book.tp[i],
+                "entry_time": book.times.iat[i],
+            }
+            book.entry_bar = i
+            book.risk      = equity * RISK_PER_TRADE
+            open_n   += 1
+            peak_open = max(peak_open, open_n)
+
+    for book in books:
+        if book.trade is not None:
+            trade = book.trade
+            trade.update({
+                "exit": None, "exit_time": None,
+                "result": "OPEN", "pnl_pips": None,
+                "pnl_dollar": None, "equity": equity
+            })
+            trades.append(trade)
+    return trades, {"bars": bars, "peak_open": peak_open, "capped": capped}
+
+def by_symbol(trades: TradeLedger) -> pd.DataFrame:
+    """Closed-trade count, win rate and P&L contribution per symbol."""
+    closed = trades.closed().to_frame()
+    if closed.empty:
+        return pd.DataFrame()
+    by = closed.groupby("symbol", sort=False)
+    return pd.DataFrame({
+        "trades":   by.size(),
+        "win_rate": (by["result"].apply(lambda r: (r == "TP").mean()) * 100).round(1),
+        "pnl":      by["pnl_dollar"].sum().round(2),
+    })
+
+# ──────────────────────────────
+# MAIN
+# ──────────────────────────────
+def main():
+    parser = argparse.ArgumentParser(description="Shared-equity portfolio backtest")
+    parser.add_argument("--symbol", action="append", help="repeatable; default WATCHLIST")
+    parser.add_argument("--max-positions", type=int, default=MAX_POSITIONS)
+    args, _ = parser.parse_known_args()
+    symbols = args.symbol or SYMBOLS
+
+    with instrumented("portfolio"):
+        print(f"[INFO] Portfolio backtest: {', '.join(symbols)}, "
+              f"max {args.max_positions} open positions...")
+        with span("fetch"):
+            frames = fetch_history(symbols)
+
+        prepared = {}
+        for symbol in symbols:
+            with span("prepare", symbol):
+                ready = prepare_frames(symbol, frames)
+            if ready is not None:
+                prepared[symbol] = ready
+        if not prepared:
+            return
+
+        with span("simulate"):
+            trades, info = simulate_portfolio(prepared, args.max_positions)
+        print(f"[INFO] {info['bars']:,} bars replayed | {len(trades)} trades | "
+              f"peak {info['peak_open']} open | {info['capped']} signals capped")
+        table = by_symbol(trades)
+        if not table.empty:
+            print(table.to_string())
+
+        with span("stats"):
+            stats = calc_stats(trades, INITIAL_EQUITY)
+        with span("monte_carlo"):
+            mc    = monte_carlo(trades, RISK_PER_TRADE)
+        with span("report"):
+            report = build_report(stats, trades, f"Portfolio ({', '.join(prepared)})", mc)
+        print(report)
+        with span("alert"):
+            send_alert(report)
+        with span("deliver"):
+            flush_alerts(timeout=60)
+
+if __name__ == "__main__":
+    main()
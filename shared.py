@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+
+class SharedFrames:
+    """
+    Packs DataFrames (numeric + datetime columns) and plain arrays
+    into one shared-memory block so worker processes map the same
+    pages instead of each unpickling a copy. `handle` is the small
+    picklable part to hand to workers; they call attach(handle).
+    The creating process owns the block: close() unlinks it.
+    """
+
+    def __init__(self, objects: dict):
+        layout, offset = {}, 0
+        arrays = {}
+        for name, obj in objects.items():
+            if obj is None:
+                layout[name] = None
+                continue
+            if isinstance(obj, pd.DataFrame):
+                cols = {}
+                for col in obj.columns:
+                    values = obj[col]
+                    if isinstance(values.dtype, pd.DatetimeTZDtype) or \
+                            pd.api.types.is_datetime64_dtype(values):
+                        kind = "datetime"
+                        arr  = values.dt.tz_convert("UTC").dt.as_unit("ns") \
+                                     .to_numpy("datetime64[ns]").view("int64") \
+                               if values.dt.tz is not None else \
+                               values.dt.as_unit("ns").to_numpy().view("int64")
+                    elif pd.api.types.is_bool_dtype(values) or \
+                            pd.api.types.is_numeric_dtype(values):
+                        kind, arr = "array", values.to_numpy()
+                    else:
+                        raise TypeError(f"{name}.{col}: unsupported dtype {values.dtype}")
+                    cols[col] = (kind, arr)
+            else:
+                cols = {None: ("array", np.asarray(obj))}
+
+            entry = {}
+            for col, (kind, arr) in cols.items():
+                arr = np.ascontiguousarray(arr)
+                entry[col] = (kind, arr.dtype.str, arr.shape, offset)
+                arrays[(name, col)] = (arr, offset)
+                offset += -(-arr.nbytes // 8) * 8      # keep 8-byte alignment
+            layout[name] = entry
+
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for arr, start in arrays.values():
+            np.ndarray(arr.shape, arr.dtype, self.shm.buf, start)[...] = arr
+        self.handle = (self.shm.name, layout)
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def attach(handle) -> tuple[shared_memory.SharedMemory, dict]:
+    """
+    Worker side: (segment, {name: DataFrame | ndarray | None}).
+    Column data are read-only views onto the segment; keep the
+    returned segment referenced for as long as the views are used.
+    """
+    name, layout = handle
+    shm = shared_memory.SharedMemory(name=name)
+    out = {}
+    for key, entry in layout.items():
+        if entry is None:
+            out[key] = None
+            continue
+        cols = {}
+        for col, (kind, dtype, shape, start) in entry.items():
+            arr = np.ndarray(shape, np.dtype(dtype), shm.buf, start)
+            arr.flags.writeable = False
+            cols[col] = pd.to_datetime(arr, unit="ns", utc=True) \
+                        if kind == "datetime" else arr
+        out[key] = cols[None] if None in cols else pd.DataFrame(cols, copy=False)
+    return shm, out
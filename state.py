@@ -1,7 +1,8 @@
 import os
 import json
-import gspread
-from google.oauth2.service_account import Credentials
+import sqlite3
+import threading
+from telemetry import count
 
 SHEET_NAME = "TradingBotState"
 SCOPE = [
@@ -9,38 +10,147 @@ SCOPE = [
     "https://www.googleapis.com/auth/drive"
 ]
 
-creds_json = os.getenv("GOOGLE_SERVICE_ACCOUNT_JSON")
-if not creds_json:
-    raise ValueError("GOOGLE_SERVICE_ACCOUNT_JSON secret is not set!")
+STATE_BACKEND = os.getenv("STATE_BACKEND", "sheets")    # sheets | local
+STATE_DB      = os.getenv("STATE_DB", ".state/state.db")
 
-creds = Credentials.from_service_account_info(
-    json.loads(creds_json), scopes=SCOPE
-)
-gc    = gspread.authorize(creds)
-sheet = gc.open(SHEET_NAME).sheet1
+_sheet = None
 
-_cache:  dict = {}
-_loaded: bool = False
+def get_sheet():
+    """Authorizes gspread and opens the sheet on first use."""
+    global _sheet
+    if _sheet is None:
+        import gspread
+        from google.oauth2.service_account import Credentials
 
-def _load():
-    global _cache, _loaded
-    if not _loaded:
-        records = sheet.get_all_records()
-        _cache  = {r["symbol"]: r["last_signal"] for r in records}
-        _loaded = True
+        creds_json = os.getenv("GOOGLE_SERVICE_ACCOUNT_JSON")
+        if not creds_json:
+            raise ValueError("GOOGLE_SERVICE_ACCOUNT_JSON secret is not set!")
+
+        creds  = Credentials.from_service_account_info(
+            json.loads(creds_json), scopes=SCOPE
+        )
+        _sheet = gspread.authorize(creds).open(SHEET_NAME).sheet1
+    return _sheet
+
+class StateStore:
+    """
+    Last signal per symbol in SQLite (primary-key lookups), mirrored
+    to the Google Sheet write-behind: the sheet is read once when the
+    store opens, and changed rows go back in one batch on sync().
+    mirror=False keeps everything local (tests, backtests); path
+    ":memory:" skips the file too.
+    """
+
+    def __init__(self, path: str = STATE_DB, mirror: bool = True):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.mirror = mirror
+        self._lock  = threading.Lock()
+        self._db    = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS signals ("
+            " symbol TEXT PRIMARY KEY, last_signal TEXT,"
+            " sheet_row INTEGER, dirty INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._db.commit()
+        self._pulled    = not mirror
+        self._pull_lock = threading.Lock()
+
+    def _pull(self):
+        """
+        Seeds the table from the sheet; unsynced local writes win.
+        Pipeline workers may race to the first call: one pulls, the
+        rest wait for it.
+        """
+        if self._pulled:
+            return
+        with self._pull_lock:
+            if self._pulled:
+                return
+            count("http.sheets")
+            records = get_sheet().get_all_records()
+            with self._lock, self._db:
+                for row, r in enumerate(records, start=2):
+                    self._db.execute(
+                        "INSERT INTO signals (symbol, last_signal, sheet_row) VALUES (?, ?, ?)"
+                        " ON CONFLICT(symbol) DO UPDATE SET sheet_row = excluded.sheet_row,"
+                        " last_signal = CASE WHEN dirty THEN last_signal"
+                        " ELSE excluded.last_signal END",
+                        (r["symbol"], r["last_signal"] or None, row),
+                    )
+            self._pulled = True
+
+    def get(self, symbol: str) -> str | None:
+        self._pull()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT last_signal FROM signals WHERE symbol = ?", (symbol,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, symbol: str, signal: str):
+        self._pull()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO signals (symbol, last_signal, dirty) VALUES (?, ?, 1)"
+                " ON CONFLICT(symbol) DO UPDATE SET last_signal = excluded.last_signal,"
+                " dirty = 1 WHERE last_signal IS NOT excluded.last_signal",
+                (symbol, signal),
+            )
+
+    def sync(self) -> int:
+        """Pushes dirty rows to the sheet in one batch; returns the count."""
+        if not self.mirror:
+            return 0
+        with self._lock:
+            dirty = self._db.execute(
+                "SELECT symbol, last_signal, sheet_row FROM signals WHERE dirty"
+            ).fetchall()
+            last_row = self._db.execute(
+                "SELECT COALESCE(MAX(sheet_row), 1) FROM signals"
+            ).fetchone()[0]
+        if not dirty:
+            return 0
+
+        sheet    = get_sheet()
+        updates  = [{"range": f"B{row}", "values": [[signal]]}
+                    for _, signal, row in dirty if row]
+        appended = [(symbol, signal) for symbol, signal, row in dirty if not row]
+        if updates:
+            count("http.sheets")
+            sheet.batch_update(updates)
+        if appended:
+            count("http.sheets")
+            sheet.append_rows([list(r) for r in appended])
+
+        with self._lock, self._db:
+            for symbol, signal, _ in dirty:
+                self._db.execute(
+                    "UPDATE signals SET dirty = 0 WHERE symbol = ? AND last_signal IS ?",
+                    (symbol, signal),
+                )
+            for offset, (symbol, _) in enumerate(appended, start=1):
+                self._db.execute(
+                    "UPDATE signals SET sheet_row = ? WHERE symbol = ?",
+                    (last_row + offset, symbol),
+                )
+        return len(dirty)
+
+_store: StateStore | None = None
+
+def state_store() -> StateStore:
+    """Process-wide store; STATE_BACKEND=local never touches the sheet."""
+    global _store
+    if _store is None:
+        _store = StateStore(STATE_DB, mirror=STATE_BACKEND != "local")
+    return _store
 
 def get_last_signal(symbol: str) -> str | None:
-    _load()
-    return _cache.get(symbol)
+    return state_store().get(symbol)
 
 def set_last_signal(symbol: str, signal: str):
-    _load()
-    if _cache.get(symbol) == signal:
-        return
-    _cache[symbol] = signal
-    records = sheet.get_all_records()
-    for i, row in enumerate(records, start=2):
-        if row.get("symbol") == symbol:
-            sheet.update_cell(i, 2, signal)
-            return
-    sheet.append_row([symbol, signal])
+    state_store().set(symbol, signal)
+
+def sync_state() -> int:
+    """Flushes pending signals to the sheet (end of run / daemon pass)."""
+    return state_store().sync() if _store is not None else 0
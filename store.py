@@ -0,0 +1,149 @@
+import os
+import shutil
+from contextlib import ExitStack
+import numpy as np
+import pandas as pd
+from helpers import fetch_many
+from align import INTERVALS
+from telemetry import count
+
+CANDLE_STORE = os.getenv("CANDLE_STORE", ".state/candles")
+COLUMNS      = ("open", "high", "low", "close")
+
+class CandleStore:
+    """
+    Columnar OHLC archive: one .npy file per column under
+    <root>/<symbol>/<interval>/, read back memory-mapped so the
+    price columns of the returned frame share the file pages.
+    """
+
+    def __init__(self, root: str = CANDLE_STORE):
+        self.root = root
+
+    def _dir(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, symbol.replace("/", "_"), interval)
+
+    def read(self, symbol: str, interval: str,
+             limit: int | None = None) -> pd.DataFrame | None:
+        path = self._dir(symbol, interval)
+        if not os.path.exists(os.path.join(path, "datetime.npy")):
+            return None
+        cols = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+                for name in ("datetime",) + COLUMNS}
+        if limit:
+            cols = {name: arr[-limit:] for name, arr in cols.items()}
+        cols["datetime"] = pd.to_datetime(np.asarray(cols["datetime"]),
+                                          unit="ns", utc=True)
+        return pd.DataFrame(cols, copy=False)
+
+    def iter_chunks(self, symbol: str, interval: str, size: int):
+        """
+        The archive in order, `size` rows at a time, read sequentially
+        from the column files (not mapped), so only one chunk is ever
+        resident however long the archive is.
+        """
+        path = self._dir(symbol, interval)
+        if not os.path.exists(os.path.join(path, "datetime.npy")):
+            return
+        with ExitStack() as stack:
+            files = {}
+            for name in ("datetime",) + COLUMNS:
+                f = stack.enter_context(open(os.path.join(path, f"{name}.npy"), "rb"))
+                major, _ = np.lib.format.read_magic(f)
+                read_header = np.lib.format.read_array_header_1_0 if major == 1 \
+                              else np.lib.format.read_array_header_2_0
+                (rows,), _, dtype = read_header(f)
+                files[name] = (f, dtype)
+            for _ in range(0, rows, size):
+                chunk = {name: np.fromfile(f, dtype, count=size)
+                         for name, (f, dtype) in files.items()}
+                chunk["datetime"] = pd.to_datetime(chunk["datetime"], unit="ns", utc=True)
+                yield pd.DataFrame(chunk)
+
+    def last_time(self, symbol: str, interval: str) -> pd.Timestamp | None:
+        path = os.path.join(self._dir(symbol, interval), "datetime.npy")
+        if not os.path.exists(path):
+            return None
+        stamps = np.load(path, mmap_mode="r")
+        return pd.Timestamp(int(stamps[-1]), unit="ns", tz="UTC") if len(stamps) else None
+
+    def write(self, symbol: str, interval: str, df: pd.DataFrame) -> int:
+        """
+        Merges df into the archive — rows with a stored timestamp are
+        replaced (the still-forming bar), new ones appended — and
+        swaps the column files in atomically. Returns the row count.
+        """
+        old    = self.read(symbol, interval)
+        merged = df[["datetime", *COLUMNS]] if old is None else \
+                 pd.concat([old, df[["datetime", *COLUMNS]]])
+        merged = merged.drop_duplicates("datetime", keep="last") \
+                       .sort_values("datetime")
+
+        path = self._dir(symbol, interval)
+        tmp  = f"{path}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        stamps = merged["datetime"].dt.tz_convert("UTC").dt.as_unit("ns")
+        np.save(os.path.join(tmp, "datetime.npy"),
+                stamps.to_numpy("datetime64[ns]").view("int64"))
+        for name in COLUMNS:
+            np.save(os.path.join(tmp, f"{name}.npy"), merged[name].to_numpy(float))
+
+        if os.path.exists(path):
+            shutil.rmtree(f"{path}.old", ignore_errors=True)
+            os.replace(path, f"{path}.old")
+        os.replace(tmp, path)
+        shutil.rmtree(f"{path}.old", ignore_errors=True)
+        return len(merged)
+
+def _bars_since(last: pd.Timestamp, interval: str) -> int | None:
+    """Bars elapsed since `last` opened, counting `last` itself."""
+    step = INTERVALS.get(interval)
+    if step is None:
+        return None
+    return int((pd.Timestamp.now(tz="UTC") - last) / step) + 1
+
+def fetch_cached_many(jobs: list[tuple[str, str, int]],
+                      store: CandleStore | None = None) -> dict:
+    """
+    fetch_data backed by the local store, for many (symbol, interval,
+    limit) jobs in one concurrent batch. Only the bars after the last
+    stored one (plus that bar, which may have been forming) are
+    downloaded. Returns {(symbol, interval): newest `limit` bars},
+    None where the API call failed.
+    """
+    store = store or CandleStore()
+    sizes = {}
+    for symbol, interval, limit in jobs:
+        last   = store.last_time(symbol, interval)
+        have   = len(store.read(symbol, interval)) if last is not None else 0
+        needed = _bars_since(last, interval) if last is not None else None
+        sizes[(symbol, interval)] = (
+            min(needed, limit) if needed and have >= limit else limit, last
+        )
+        count("cache.candles_hit" if sizes[(symbol, interval)][0] < limit
+              else "cache.candles_miss")
+
+    fetched = fetch_many([(s, i, sizes[(s, i)][0]) for s, i, _ in jobs])
+
+    # Estimate fell short of the gap — refill the whole window
+    refill = [(s, i, n) for s, i, n in jobs
+              if fetched[(s, i)] is not None
+              and sizes[(s, i)][0] < n
+              and fetched[(s, i)]["datetime"].iloc[0] > sizes[(s, i)][1]]
+    fetched.update(fetch_many(refill))
+
+    frames = {}
+    for symbol, interval, limit in jobs:
+        df = fetched[(symbol, interval)]
+        if df is None:
+            frames[(symbol, interval)] = None
+            continue
+        store.write(symbol, interval, df)
+        frames[(symbol, interval)] = store.read(symbol, interval, limit)
+    return frames
+
+def fetch_cached(symbol: str, interval: str, limit: int = 100,
+                 store: CandleStore | None = None) -> pd.DataFrame | None:
+    """Single-job fetch_cached_many."""
+    return fetch_cached_many([(symbol, interval, limit)], store)[(symbol, interval)]
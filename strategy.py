@@ -1,7 +1,11 @@
+import numpy as np
 import pandas as pd
+from dataclasses import dataclass
 from helpers import rsi, bollinger_bands, atr, ema
+from align import align_frames, take
+from swing import swing_stats, swing_distance_ok, SWING_MIN_LOW
+from instruments import SYMBOLS, DEFAULT_SYMBOL, Instrument, get_instrument
 
-SYMBOLS        = ["XAU/USD"]
 RSI_PERIOD     = 14
 BB_PERIOD      = 20
 BB_STDDEV      = 2
@@ -15,170 +19,263 @@ MIN_BODY_RATIO = 0.25
 SL_MULTIPLIER  = 1.5
 TP_MULTIPLIER  = 2.5
 
-def _body_ratio(candle) -> float:
-    total = candle["high"] - candle["low"]
-    return abs(candle["close"] - candle["open"]) / total if total else 0
+BIAS_LABELS = np.array(["SELL", None, "BUY"], dtype=object)
 
-def _strong_candle(candle, direction: str) -> bool:
-    if _body_ratio(candle) < MIN_BODY_RATIO:
-        return False
-    return (candle["close"] > candle["open"]) if direction == "BUY" \
-           else (candle["close"] < candle["open"])
-
-def _clean_recent(df_1h: pd.DataFrame, lookback: int = 20) -> pd.DataFrame:
-    """
-    Strict filtering for swing window only.
-    Filters zero lows AND flat candles (< $1 range).
-    Does NOT affect indicator calculations.
-    """
-    recent = df_1h.iloc[-lookback:].copy()
-    return recent[
-        (recent["low"] > 100) &
-        (recent["high"] - recent["low"] >= 1.0)
-    ]
-
-def _away_from_swing(df_1h: pd.DataFrame, direction: str,
-                     lookback: int = 20) -> bool:
+@dataclass(frozen=True)
+class Params:
     """
-    Price must be at least 2x average candle range away
-    from swing high/low. Prevents entries at support/resistance walls.
+    Signal thresholds as one value, so a backtest or sweep can try
+    alternatives without touching the module constants above.
     """
-    recent = _clean_recent(df_1h, lookback)
-    if recent.empty:
-        return False
-
-    price      = df_1h.iloc[-1]["close"]
-    atr_val    = df_1h.iloc[-1]["atr"]
-    avg_range  = (recent["high"] - recent["low"]).mean()
-    avg_range  = max(avg_range, atr_val * 1.0)
-    swing_high = recent["high"].max()
-    swing_low  = recent["low"].min()
-
-    if direction == "SELL":
-        return price > swing_low + (avg_range * 2)
-    return price < swing_high - (avg_range * 2)
-
-def _daily_bias(df_1d) -> str | None:
+    rsi_oversold:   float = RSI_OVERSOLD
+    rsi_overbought: float = RSI_OVERBOUGHT
+    rsi_bull_zone:  float = RSI_BULL_ZONE
+    rsi_buy_max:    float = RSI_BUY_MAX
+    min_body_ratio: float = MIN_BODY_RATIO
+    sl_multiplier:  float = SL_MULTIPLIER
+    tp_multiplier:  float = TP_MULTIPLIER
+
+    @classmethod
+    def for_instrument(cls, instrument: Instrument) -> "Params":
+        """Defaults with the instrument's threshold overrides applied."""
+        return cls(**{name: getattr(instrument, name)
+                      for name in ("min_body_ratio", "sl_multiplier", "tp_multiplier")
+                      if getattr(instrument, name) is not None})
+
+DEFAULT_PARAMS = Params()
+
+def _body_ratio(df: pd.DataFrame) -> np.ndarray:
+    total = (df["high"] - df["low"]).to_numpy(float)
+    body  = (df["close"] - df["open"]).abs().to_numpy(float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(total != 0, body / total, 0.0)
+
+def _strong_candle(df: pd.DataFrame, direction: str,
+                   min_body_ratio: float = MIN_BODY_RATIO) -> np.ndarray:
+    strong = ~(_body_ratio(df) < min_body_ratio)
+    if direction == "BUY":
+        return strong & (df["close"] > df["open"]).to_numpy()
+    return strong & (df["close"] < df["open"]).to_numpy()
+
+def _daily_bias(df_1d) -> np.ndarray:
     """
     Structural bias — daily BB midline + 5-candle majority vote.
     Prevents BUY signals in falling markets and vice versa.
+    One value per daily bar: +1 BUY | -1 SELL | 0 none.
     """
-    if len(df_1d) < 5:
-        return None
-    last1d = df_1d.iloc[-1]
-    if pd.isna(last1d.get("bb_mid", float("nan"))):
-        return None
-    price_above_mid = last1d["close"] > last1d["bb_mid"]
-    bulls = sum(1 for _, c in df_1d.iloc[-5:].iterrows()
-                if c["close"] > c["open"])
-    if price_above_mid and bulls >= 3: return "BUY"
-    if not price_above_mid and bulls <= 2: return "SELL"
-    return None
-
-def _weekly_bias(df_1w) -> str | None:
+    out = np.zeros(len(df_1d), dtype=np.int8)
+    if len(df_1d) < 5 or "bb_mid" not in df_1d:
+        return out
+    mid   = df_1d["bb_mid"].to_numpy(float)
+    above = df_1d["close"].to_numpy(float) > mid
+    bulls = (df_1d["close"] > df_1d["open"]).astype(int) \
+            .rolling(5).sum().to_numpy()
+    ok    = ~np.isnan(mid)
+    ok[:4] = False
+    out[ok &  above & (bulls >= 3)] = 1
+    out[ok & ~above & (bulls <= 2)] = -1
+    return out
+
+def _weekly_bias(df_1w, min_low: float = SWING_MIN_LOW) -> np.ndarray:
     """
     Weekly EMA20 structure filter.
     Price above weekly EMA20 = bullish, below = bearish.
     When weekly conflicts with daily — no trade.
+    One value per weekly bar, from the bars up to and including it.
+    Bars with low <= min_low (bad ticks) are left out of the EMA.
     """
-    if df_1w is None or len(df_1w) < 20:
-        return None
-    df_1w = df_1w.copy()
-    df_1w = df_1w[df_1w["low"] > 100]
+    if df_1w is None:
+        return np.zeros(0, dtype=np.int8)
+    out = np.zeros(len(df_1w), dtype=np.int8)
     if len(df_1w) < 20:
-        return None
-    df_1w["ema20"] = ema(df_1w["close"], 20)
-    last = df_1w.iloc[-1]
-    if pd.isna(last["ema20"]):
-        return None
-    return "BUY" if last["close"] > last["ema20"] else "SELL"
-
-def generate_signal(df_1h, df_1d, df_1w=None, sentiment_bias: int = 0):
+        return out
+    keep  = (df_1w["low"] > min_low).to_numpy()
+    kept  = df_1w["close"][keep]
+    ema20 = ema(kept, 20).to_numpy()
+    count = np.cumsum(keep)
+    last  = np.maximum(count - 1, 0)
+    ok    = (np.arange(len(df_1w)) >= 19) & (count >= 20)
+    ok[ok] &= ~np.isnan(ema20[last[ok]])
+    above = kept.to_numpy() > ema20
+    out[ok] = np.where(above[last[ok]], 1, -1)
+    return out
+
+def signal_context(df_1h: pd.DataFrame, df_1d: pd.DataFrame,
+                   df_1w: pd.DataFrame = None, swing_window: int = 20,
+                   aligned: dict | None = None,
+                   instrument: Instrument | None = None) -> pd.DataFrame:
     """
-    sentiment_bias: +1 bullish | -1 bearish | 0 neutral
-    Returns (direction, last1h, signal_type, sl, tp)
+    The Params-independent half of compute_signals, one row per 1h
+    bar: daily / weekly bias (+1 / -1 / 0), the ready mask and the
+    swing columns. A sweep computes it once over the whole history
+    and hands row slices of it to compute_signals for every combo
+    and window. All numeric, so it fits in SharedFrames.
     """
-    # ── Indicators ──────────────────────────────────
-    df_1h["rsi"] = rsi(df_1h["close"], RSI_PERIOD)
-    df_1h["bb_upper"], df_1h["bb_mid"], df_1h["bb_lower"] = \
-        bollinger_bands(df_1h["close"], BB_PERIOD, BB_STDDEV)
-    df_1h["atr"] = atr(df_1h, ATR_PERIOD)
+    inst   = instrument or get_instrument(DEFAULT_SYMBOL)
+    n      = len(df_1h)
+    price  = df_1h["close"].to_numpy(float)
+    rsi_v  = df_1h["rsi"].to_numpy(float)
+    atr_v  = df_1h["atr"].to_numpy(float)
 
-    df_1d["bb_upper"], df_1d["bb_mid"], df_1d["bb_lower"] = \
-        bollinger_bands(df_1d["close"], BB_PERIOD, BB_STDDEV)
+    # ── Higher timeframe bias ───────────────────────
+    if aligned is None:
+        aligned = align_frames({"1h": df_1h, "1day": df_1d, "1week": df_1w}, "1h")
+    d_idx  = aligned["1day"]
+    bias   = take(_daily_bias(df_1d), d_idx)
+    w_bias = take(_weekly_bias(df_1w, inst.min_low), aligned["1week"]) \
+             if df_1w is not None else np.zeros(n, dtype=np.int8)
 
-    last1h = df_1h.iloc[-1]
-    last1d = df_1d.iloc[-1]
+    d_close = take(df_1d["close"].to_numpy(float), d_idx, np.nan)
+    inside_daily_bb = (take(df_1d["bb_lower"].to_numpy(float), d_idx, np.nan) < d_close) & \
+                      (d_close < take(df_1d["bb_upper"].to_numpy(float), d_idx, np.nan))
 
-    rsi_val = last1h["rsi"]
-    price   = last1h["close"]
-    atr_val = last1h["atr"]
+    ready = (np.arange(n) >= 1) & ~np.isnan(rsi_v) & ~np.isnan(atr_v) \
+            & (atr_v != 0) & (bias != 0) \
+            & ((w_bias == 0) | (w_bias == bias)) & inside_daily_bb
 
-    if pd.isna(rsi_val) or pd.isna(atr_val) or atr_val == 0:
-        return None, last1h, None, None, None
+    # ── Swing distance ──────────────────────────────
+    swing = swing_stats(df_1h, swing_window, inst.min_low, inst.min_range)
 
-    # ── Daily bias ──────────────────────────────────
-    daily_bias = _daily_bias(df_1d)
-    if daily_bias is None:
-        return None, last1h, None, None, None
+    return pd.DataFrame({
+        "daily_bias":  bias,
+        "weekly_bias": w_bias,
+        "ready":       ready,
+        "swing_high":  swing["swing_high"],
+        "swing_low":   swing["swing_low"],
+        "avg_range":   np.maximum(swing["swing_range"], atr_v * 1.0),
+        "away_buy":    swing_distance_ok(price, atr_v, swing, "BUY"),
+        "away_sell":   swing_distance_ok(price, atr_v, swing, "SELL"),
+    }, index=df_1h.index)
 
-    # ── Weekly bias — must align with daily ─────────
-    weekly_bias = _weekly_bias(df_1w)
-    if weekly_bias and weekly_bias != daily_bias:
-        return None, last1h, None, None, None
+def compute_signals(df_1h: pd.DataFrame, df_1d: pd.DataFrame,
+                    df_1w: pd.DataFrame = None, sentiment_bias: int = 0,
+                    swing_window: int = 20,
+                    aligned: dict | None = None,
+                    instrument: Instrument | None = None,
+                    params: Params | None = None,
+                    context: pd.DataFrame | None = None) -> pd.DataFrame:
+    """
+    Applies the generate_signal rules to every 1h bar in one pass.
+    Expects rsi/bb/atr columns on df_1h and bb columns on df_1d.
+    By default each 1h bar reads the last daily/weekly bar that had
+    closed by its own close (align_frames), never the one still
+    forming; pass `aligned` to reuse a precomputed align_frames
+    result or to choose another alignment (generate_signal does).
+    `context` is a precomputed signal_context for the same rows
+    (df_1d / df_1w / aligned / swing_window are then unused), so a
+    slice of df_1h can be evaluated with its full-history context.
+    `instrument` supplies the price filters and SL / TP decimals
+    (default: the DEFAULT_SYMBOL registry entry); `params` the thresholds
+    (default: Params.for_instrument(instrument)).
+    Returns one row per 1h bar with the four setup masks,
+    direction, signal_type, sl and tp (None/NaN when no signal).
+    """
+    inst = (instrument or get_instrument(DEFAULT_SYMBOL)).for_prices(df_1h["close"])
+    p    = params or Params.for_instrument(inst)
+    dp   = inst.decimals
 
-    # ── Daily BB structure ───────────────────────────
-    inside_daily_bb = last1d["bb_lower"] < last1d["close"] < last1d["bb_upper"]
-    if not inside_daily_bb:
-        return None, last1h, None, None, None
+    price  = df_1h["close"].to_numpy(float)
+    rsi_v  = df_1h["rsi"].to_numpy(float)
+    atr_v  = df_1h["atr"].to_numpy(float)
+    bb_mid = df_1h["bb_mid"].to_numpy(float)
+
+    if context is None:
+        context = signal_context(df_1h, df_1d, df_1w, swing_window, aligned, inst)
+    bias      = context["daily_bias"].to_numpy()
+    w_bias    = context["weekly_bias"].to_numpy()
+    ready     = context["ready"].to_numpy()
+    away_buy  = context["away_buy"].to_numpy()
+    away_sell = context["away_sell"].to_numpy()
 
     # ── Signal Detection ────────────────────────────
-    direction   = None
-    signal_type = None
-
-    # Trend continuation — RSI_BUY_MAX caps BUY at 58
-    if (daily_bias == "BUY"
-            and price > last1h["bb_mid"]
-            and RSI_BULL_ZONE < rsi_val < RSI_BUY_MAX
-            and _strong_candle(last1h, "BUY")
-            and _away_from_swing(df_1h, "BUY")):
-        direction, signal_type = "BUY", "Trend"
-
-    elif (daily_bias == "SELL"
-            and price < last1h["bb_mid"]
-            and RSI_OVERSOLD < rsi_val < RSI_BULL_ZONE
-            and _strong_candle(last1h, "SELL")
-            and _away_from_swing(df_1h, "SELL")):
-        direction, signal_type = "SELL", "Trend"
-
-    # Mean reversion at BB extremes
-    elif (daily_bias == "BUY"
-            and price <= last1h["bb_lower"]
-            and rsi_val <= RSI_OVERSOLD
-            and _strong_candle(last1h, "BUY")):
-        direction, signal_type = "BUY", "Reversal"
-
-    elif (daily_bias == "SELL"
-            and price >= last1h["bb_upper"]
-            and rsi_val >= RSI_OVERBOUGHT
-            and _strong_candle(last1h, "SELL")):
-        direction, signal_type = "SELL", "Reversal"
+    strong_buy  = _strong_candle(df_1h, "BUY", p.min_body_ratio)
+    strong_sell = _strong_candle(df_1h, "SELL", p.min_body_ratio)
+    buy_trend   = ready & (bias == 1) & (price > bb_mid) \
+                  & (p.rsi_bull_zone < rsi_v) & (rsi_v < p.rsi_buy_max) \
+                  & strong_buy & away_buy
+    sell_trend  = ready & (bias == -1) & (price < bb_mid) \
+                  & (p.rsi_oversold < rsi_v) & (rsi_v < p.rsi_bull_zone) \
+                  & strong_sell & away_sell
+    buy_rev     = ready & (bias == 1) \
+                  & (price <= df_1h["bb_lower"].to_numpy(float)) \
+                  & (rsi_v <= p.rsi_oversold) & strong_buy
+    sell_rev    = ready & (bias == -1) \
+                  & (price >= df_1h["bb_upper"].to_numpy(float)) \
+                  & (rsi_v >= p.rsi_overbought) & strong_sell
 
-    if not direction:
-        return None, last1h, None, None, None
+    setups    = [buy_trend, sell_trend, buy_rev, sell_rev]
+    direction = np.select(setups, [1, -1, 1, -1], 0)
+    sig_type  = np.select(setups, ["Trend", "Trend", "Reversal", "Reversal"], "")
 
     # ── Sentiment Gate ──────────────────────────────
-    if sentiment_bias == 1  and direction == "SELL":
-        return None, last1h, None, None, None
-    if sentiment_bias == -1 and direction == "BUY":
-        return None, last1h, None, None, None
+    if sentiment_bias:
+        direction[direction == -sentiment_bias] = 0
 
     # ── SL / TP ─────────────────────────────────────
-    if direction == "BUY":
-        sl = round(price - atr_val * SL_MULTIPLIER, 2)
-        tp = round(price + atr_val * TP_MULTIPLIER, 2)
-    else:
-        sl = round(price + atr_val * SL_MULTIPLIER, 2)
-        tp = round(price - atr_val * TP_MULTIPLIER, 2)
+    sl = np.where(direction == 1,  np.round(price - atr_v * p.sl_multiplier, dp),
+         np.where(direction == -1, np.round(price + atr_v * p.sl_multiplier, dp), np.nan))
+    tp = np.where(direction == 1,  np.round(price + atr_v * p.tp_multiplier, dp),
+         np.where(direction == -1, np.round(price - atr_v * p.tp_multiplier, dp), np.nan))
+
+    sig_type = sig_type.astype(object)
+    sig_type[direction == 0] = None
+
+    def labels(values: np.ndarray) -> pd.Series:
+        # object dtype keeps None (not NaN) for "no signal"
+        return pd.Series(values, index=df_1h.index, dtype=object)
+
+    return pd.DataFrame({
+        "daily_bias":    labels(BIAS_LABELS[bias + 1]),
+        "weekly_bias":   labels(BIAS_LABELS[w_bias + 1]),
+        "ready":         ready,
+        "swing_high":    context["swing_high"].to_numpy(),
+        "swing_low":     context["swing_low"].to_numpy(),
+        "avg_range":     context["avg_range"].to_numpy(),
+        "away_buy":      away_buy,
+        "away_sell":     away_sell,
+        "buy_trend":     buy_trend,
+        "sell_trend":    sell_trend,
+        "buy_reversal":  buy_rev,
+        "sell_reversal": sell_rev,
+        "direction":     labels(BIAS_LABELS[direction + 1]),
+        "signal_type":   labels(sig_type),
+        "sl":            sl,
+        "tp":            tp,
+    }, index=df_1h.index)
+
+def sentiment_blocks(direction: str | None, sentiment_bias: int) -> bool:
+    """True when news sentiment vetoes the direction (the sentiment gate)."""
+    return (sentiment_bias == 1  and direction == "SELL") or \
+           (sentiment_bias == -1 and direction == "BUY")
+
+def generate_signal(df_1h, df_1d, df_1w=None, sentiment_bias: int = 0,
+                    instrument: Instrument | None = None):
+    """
+    sentiment_bias: +1 bullish | -1 bearish | 0 neutral
+    instrument: per-symbol settings (instruments.get_instrument)
+    Live, the latest 1h bar reads today's forming daily/weekly bar:
+    its close so far is the current price, so nothing is read ahead.
+    Returns (direction, last1h, signal_type, sl, tp)
+    """
+    # ── Indicators ──────────────────────────────────
+    # Already present when main.py fed df_1h through incremental.py
+    if "rsi" not in df_1h:
+        df_1h["rsi"] = rsi(df_1h["close"], RSI_PERIOD)
+        df_1h["bb_upper"], df_1h["bb_mid"], df_1h["bb_lower"] = \
+            bollinger_bands(df_1h["close"], BB_PERIOD, BB_STDDEV)
+        df_1h["atr"] = atr(df_1h, ATR_PERIOD)
 
-    return direction, last1h, signal_type, sl, tp
+    df_1d["bb_upper"], df_1d["bb_mid"], df_1d["bb_lower"] = \
+        bollinger_bands(df_1d["close"], BB_PERIOD, BB_STDDEV)
+
+    last1h  = df_1h.iloc[-1]
+    aligned = align_frames({"1h": df_1h, "1day": df_1d, "1week": df_1w}, "1h",
+                           closed_only=False)
+    sig     = compute_signals(df_1h, df_1d, df_1w, sentiment_bias,
+                              aligned=aligned, instrument=instrument)
+
+    direction = sig["direction"].iat[-1]
+    if not direction:
+        return None, last1h, None, None, None
+    return (direction, last1h, sig["signal_type"].iat[-1],
+            sig["sl"].iat[-1], sig["tp"].iat[-1])
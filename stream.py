@@ -0,0 +1,226 @@
+import argparse
+import os
+from collections import deque
+import numpy as np
+import pandas as pd
+from backtest import (first_exit, in_sl_zone, settle_trade, build_report,
+                      fetch_history, RunningStats, INITIAL_EQUITY, SWING_WINDOW,
+                      BACKTEST_SOURCE)
+from helpers import bollinger_bands, send_alert, flush_alerts
+from incremental import RSI, ATR
+from instruments import DEFAULT_SYMBOL, Instrument, get_instrument
+from ledger import TradeLedger
+from store import CandleStore
+from strategy import (compute_signals, Params, RSI_PERIOD, BB_PERIOD,
+                      BB_STDDEV, ATR_PERIOD)
+from telemetry import instrumented, span
+
+# ──────────────────────────────
+# CONFIG
+# ──────────────────────────────
+STREAM_CHUNK   = int(os.getenv("STREAM_CHUNK", "50000"))    # 1h bars per chunk
+CONTEXT        = max(SWING_WINDOW, BB_PERIOD)               # bars carried between chunks
+TAIL_COLUMNS   = ["datetime", "open", "high", "low", "close", "rsi", "atr"]
+STREAM_HISTORY = (("1day", 5000), ("1week", 5000))          # higher frames, held whole
+                                                            # (API max; the archive is read whole)
+
+# ──────────────────────────────
+# CHUNK SOURCES
+# ──────────────────────────────
+def csv_chunks(path: str, size: int = STREAM_CHUNK):
+    """datetime,open,high,low,close CSV (oldest first), `size` rows at a time."""
+    for chunk in pd.read_csv(path, chunksize=size):
+        chunk["datetime"] = pd.to_datetime(chunk["datetime"], utc=True)
+        yield chunk.astype({"open": float, "high": float, "low": float, "close": float})
+
+def archive_chunks(symbol: str, interval: str = "1h", size: int = STREAM_CHUNK,
+                   store: CandleStore | None = None):
+    return (store or CandleStore()).iter_chunks(symbol, interval, size)
+
+# ──────────────────────────────
+# STREAMING BACKTEST
+# ──────────────────────────────
+class StreamingBacktest:
+    """
+    simulate_trades over 1h history fed in consecutive chunks, so
+    memory follows the chunk size rather than the history length.
+    Between chunks it keeps only: RSI / ATR state (incremental.py
+    streaming classes — the exact pandas recursion), the last CONTEXT
+    bars for the fixed-window Bollinger / swing columns, the open
+    trade, SL zones and running stats. df_1d / df_1w are held whole;
+    they are 24× / 120× smaller than the 1h stream.
+    feed() returns the trades closed in that chunk; finish() the
+    trade still open at the end, if any.
+    """
+
+    def __init__(self, df_1d: pd.DataFrame, df_1w: pd.DataFrame | None = None,
+                 instrument: Instrument | None = None, params: Params | None = None,
+                 initial_equity: float = INITIAL_EQUITY):
+        self.df_1d      = df_1d
+        self.df_1w      = df_1w
+        self.instrument = (instrument or get_instrument(DEFAULT_SYMBOL)) \
+                          .for_prices(df_1d["close"])
+        self.params     = params
+        self.equity     = initial_equity
+        self.stats      = RunningStats(initial_equity)
+        self.recent     = deque(maxlen=5)        # for build_report's trade log
+        self.rsi        = RSI(RSI_PERIOD)
+        self.atr        = ATR(ATR_PERIOD)
+        self.tail       = None                   # last CONTEXT bars seen
+        self.bars       = 0                      # global index of the next bar
+        self.flat_from  = BB_PERIOD + 1          # first bar a new entry may use
+        self.trade      = None
+        self.sl_zones   = []
+
+    def _carry(self, chunk: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+        high, low, close = (chunk[c].to_numpy(float) for c in ("high", "low", "close"))
+        rsi_v, atr_v = np.empty(len(chunk)), np.empty(len(chunk))
+        for j in range(len(chunk)):
+            bar = {"high": high[j], "low": low[j], "close": close[j]}
+            rsi_v[j] = self.rsi.update(bar)
+            atr_v[j] = self.atr.update(bar)
+        return rsi_v, atr_v
+
+    def feed(self, chunk: pd.DataFrame) -> list[dict]:
+        chunk = chunk[chunk["low"] > 0].reset_index(drop=True)
+        if chunk.empty:
+            return []
+        chunk = chunk[TAIL_COLUMNS[:5]]
+        chunk["rsi"], chunk["atr"] = self._carry(chunk)
+
+        ctx   = 0 if self.tail is None else len(self.tail)
+        frame = chunk if self.tail is None else \
+                pd.concat([self.tail, chunk], ignore_index=True)
+        frame["bb_upper"], frame["bb_mid"], frame["bb_lower"] = bollinger_bands(
+            frame["close"], BB_PERIOD, BB_STDDEV
+        )
+        closed = self._trade(frame, ctx, self.bars - ctx)
+
+        self.bars += len(chunk)
+        self.tail  = frame.iloc[-CONTEXT:][TAIL_COLUMNS].reset_index(drop=True)
+        return closed
+
+    def _trade(self, frame: pd.DataFrame, ctx: int, base: int) -> list[dict]:
+        """Exits and entries on frame rows >= ctx; base is row 0's bar index."""
+        high   = frame["high"].to_numpy(float)
+        low    = frame["low"].to_numpy(float)
+        close  = frame["close"].to_numpy(float)
+        atrs   = frame["atr"].to_numpy(float)
+        times  = frame["datetime"]
+        closed = []
+
+        if self.trade is not None:
+            exit_bar, hit_tp = first_exit(high, low, ctx, self.trade["direction"],
+                                          self.trade["sl"], self.trade["tp"])
+            if exit_bar is None:
+                return closed
+            self._close(exit_bar, hit_tp, times, base, closed)
+
+        sig = compute_signals(frame, self.df_1d, self.df_1w, swing_window=SWING_WINDOW,
+                              instrument=self.instrument, params=self.params)
+        entries = np.flatnonzero(sig["direction"].notna().to_numpy())
+        entries = entries[(entries >= ctx) & (entries + base >= self.flat_from)]
+
+        k = 0
+        while k < len(entries):
+            i = int(entries[k])
+            k += 1
+            direction     = sig["direction"].iat[i]
+            self.sl_zones = [z for z in self.sl_zones if base + i - z["bar"] <= 30]
+            if in_sl_zone(close[i], direction, self.sl_zones, atrs[i]):
+                continue
+
+            self.trade = {
+                "symbol":     self.instrument.symbol,
+                "direction":  direction,
+                "type":       sig["signal_type"].iat[i],
+                "entry":      close[i],
+                "sl":         sig["sl"].iat[i],
+                "tp":         sig["tp"].iat[i],
+                "entry_time": times.iat[i],
+            }
+            exit_bar, hit_tp = first_exit(high, low, i + 1, direction,
+                                          self.trade["sl"], self.trade["tp"])
+            if exit_bar is None:
+                break
+            self._close(exit_bar, hit_tp, times, base, closed)
+            k = int(np.searchsorted(entries, exit_bar, side="right"))
+        return closed
+
+    def _close(self, exit_bar: int, hit_tp: bool, times: pd.Series,
+               base: int, closed: list[dict]):
+        trade, self.trade = self.trade, None
+        self.equity = settle_trade(trade, hit_tp, times.iat[exit_bar], self.equity,
+                                   decimals=self.instrument.decimals)
+        if trade["result"] == "SL":
+            self.sl_zones.append({"direction": trade["direction"],
+                                  "price": trade["exit"], "bar": base + exit_bar})
+        self.flat_from = base + exit_bar + 1
+        self.stats.add(trade)
+        self.recent.append(trade)
+        closed.append(trade)
+
+    def finish(self) -> list[dict]:
+        if self.trade is None:
+            return []
+        self.trade.update({
+            "exit": None, "exit_time": None,
+            "result": "OPEN", "pnl_pips": None,
+            "pnl_dollar": None, "equity": self.equity
+        })
+        self.stats.open_trades = 1
+        return [self.trade]
+
+# ──────────────────────────────
+# MAIN
+# ──────────────────────────────
+def main():
+    parser = argparse.ArgumentParser(description="Chunked streaming backtest")
+    parser.add_argument("--symbol", default=DEFAULT_SYMBOL)
+    parser.add_argument("--csv", help="1h candles CSV; default the candle archive")
+    parser.add_argument("--chunk", type=int, default=STREAM_CHUNK)
+    parser.add_argument("--trades", help="append closed trades to this CSV")
+    args, _ = parser.parse_known_args()
+
+    with instrumented("stream"):
+        print(f"[INFO] Streaming backtest for {args.symbol}...")
+        # Higher frames come from wherever the 1h stream does
+        source = BACKTEST_SOURCE if args.csv else "store"
+        with span("fetch"):
+            frames = fetch_history([args.symbol], STREAM_HISTORY, source)
+        df_1d, df_1w = frames[(args.symbol, "1day")], frames[(args.symbol, "1week")]
+        if df_1d is None:
+            print(f"[ERROR] No daily data for {args.symbol}")
+            return
+        df_1d = df_1d.copy()
+        df_1d["bb_upper"], df_1d["bb_mid"], df_1d["bb_lower"] = bollinger_bands(
+            df_1d["close"], BB_PERIOD, BB_STDDEV
+        )
+
+        bt     = StreamingBacktest(df_1d, df_1w, get_instrument(args.symbol))
+        chunks = csv_chunks(args.csv, args.chunk) if args.csv else \
+                 archive_chunks(args.symbol, "1h", args.chunk)
+        header = True
+        for chunk in chunks:
+            with span("chunk", args.symbol):
+                closed = bt.feed(chunk)
+            if args.trades and closed:
+                TradeLedger.from_records(closed).to_frame() \
+                           .to_csv(args.trades, mode="w" if header else "a",
+                                   header=header, index=False)
+                header = False
+            stats = bt.stats.summary()
+            print(f"[INFO] {bt.bars:,} bars | {stats.get('total_trades', 0)} trades | "
+                  f"equity ${bt.equity:,.2f} | max DD {stats.get('max_drawdown', 0)}%")
+
+        opened = bt.finish()
+        report = build_report(bt.stats.summary(), list(bt.recent) + opened, args.symbol,
+                              period=f"{bt.bars:,} bars streamed")
+        print(report)
+        with span("alert", args.symbol):
+            send_alert(report)
+        with span("deliver"):
+            flush_alerts(timeout=60)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import argparse
+import itertools
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import fields, replace
+import numpy as np
+import pandas as pd
+from backtest import (fetch_history, prepare_frames, simulate_trades,
+                      calc_stats, INITIAL_EQUITY, SWING_WINDOW)
+from instruments import DEFAULT_SYMBOL, get_instrument
+from shared import SharedFrames, attach
+from strategy import Params, signal_context
+
+# ──────────────────────────────
+# CONFIG
+# ──────────────────────────────
+SWEEP_WORKERS = int(os.getenv("SWEEP_WORKERS", str(os.cpu_count() or 1)))
+RANK_BY       = "profit_factor"
+MIN_TRADES    = 5       # fewer closed trades than this rank last
+
+# Used when no --param is given: a neighbourhood of the defaults
+DEFAULT_GRID = {
+    "rsi_bull_zone":  [46, 48, 50],
+    "rsi_buy_max":    [56, 58, 60],
+    "min_body_ratio": [0.2, 0.25, 0.3],
+    "sl_multiplier":  [1.25, 1.5, 2.0],
+    "tp_multiplier":  [2.0, 2.5, 3.0],
+}
+
+PARAM_NAMES = [f.name for f in fields(Params)]
+
+# ──────────────────────────────
+# GRID
+# ──────────────────────────────
+def parse_axis(spec: str) -> tuple[str, list[float]]:
+    """
+    "name=a,b,c" or "name=start:stop:step" (stop inclusive) into
+    (name, values). name must be a Params field.
+    """
+    name, _, values = spec.partition("=")
+    name = name.strip()
+    if name not in PARAM_NAMES:
+        raise ValueError(f"Unknown parameter {name!r} (one of {', '.join(PARAM_NAMES)})")
+    if ":" in values:
+        start, stop, step = (float(v) for v in values.split(":"))
+        count = int(round((stop - start) / step)) + 1
+        return name, [round(start + k * step, 10) for k in range(count)]
+    return name, [float(v) for v in values.split(",") if v.strip()]
+
+def build_grid(axes: dict[str, list], samples: int | None = None,
+               seed: int | None = None) -> list[dict]:
+    """Every combination of axes, or a random `samples` of them."""
+    names  = list(axes)
+    combos = [dict(zip(names, values))
+              for values in itertools.product(*(axes[n] for n in names))]
+    if samples and samples < len(combos):
+        combos = random.Random(seed).sample(combos, samples)
+    return combos
+
+# ──────────────────────────────
+# WORKERS
+# ──────────────────────────────
+# Filled once per worker process by _init: the frames, alignment and
+# signal_context live in shared memory, only the parameter dicts
+# travel per task.
+_worker: dict = {}
+
+def _init(handle, symbol: str):
+    shm, data = attach(handle)
+    sys.stdout = open(os.devnull, "w")     # simulate_trades is chatty
+    instrument = get_instrument(symbol).for_prices(data["1h"]["close"])
+    _worker.update(data, shm=shm, instrument=instrument)
+
+def _evaluate(task: tuple) -> dict:
+    combo, start, stop = task
+    w       = _worker
+    trades  = simulate_trades(w["1h"], w["1day"], w["1week"],
+                              instrument=w["instrument"],
+                              params=replace(Params.for_instrument(w["instrument"]), **combo),
+                              start=start, stop=stop, context=w["context"])
+    return {**combo, **calc_stats(trades, INITIAL_EQUITY)}
+
+def evaluate_many(df_1h: pd.DataFrame, df_1d: pd.DataFrame, df_1w: pd.DataFrame,
+                  tasks: list[tuple], symbol: str = DEFAULT_SYMBOL,
+                  workers: int = SWEEP_WORKERS,
+                  context: pd.DataFrame | None = None) -> list[dict]:
+    """
+    simulate_trades + calc_stats for every (combo, start, stop) task
+    on a process pool. Indicator frames and their signal_context
+    (biases, swing columns) are computed and packed into shared
+    memory once; each worker maps them instead of receiving copies,
+    and a task only runs the Params rules over its own window.
+    Pass `context` to reuse a signal_context already computed.
+    Returns one row per task: parameters, stats.
+    """
+    if context is None:
+        context = signal_context(df_1h, df_1d, df_1w, SWING_WINDOW,
+                                 instrument=get_instrument(symbol))
+    shared  = {"1h": df_1h, "1day": df_1d, "1week": df_1w, "context": context}
+
+    with SharedFrames(shared) as frames, \
+            ProcessPoolExecutor(workers, initializer=_init,
+                                initargs=(frames.handle, symbol)) as pool:
+        chunk = max(1, len(tasks) // (workers * 8))
+        return list(pool.map(_evaluate, tasks, chunksize=chunk))
+
+def run_sweep(df_1h: pd.DataFrame, df_1d: pd.DataFrame, df_1w: pd.DataFrame,
+              combos: list[dict], symbol: str = DEFAULT_SYMBOL,
+              workers: int = SWEEP_WORKERS,
+              window: tuple = (None, None)) -> pd.DataFrame:
+    """Every combo over the bar window [start, stop) of df_1h."""
+    return pd.DataFrame(evaluate_many(df_1h, df_1d, df_1w,
+                                      [(combo, *window) for combo in combos],
+                                      symbol, workers))
+
+def rank(results: pd.DataFrame, by: str = RANK_BY,
+         min_trades: int = MIN_TRADES) -> pd.DataFrame:
+    """Best first by `by` (then total_pnl); thin samples go last."""
+    if results.empty or by not in results:
+        return results
+    enough = results["total_trades"].fillna(0) >= min_trades
+    ranked = pd.concat([
+        results[enough].sort_values([by, "total_pnl"], ascending=False),
+        results[~enough].sort_values([by, "total_pnl"], ascending=False),
+    ])
+    ranked.index = np.arange(1, len(ranked) + 1)
+    return ranked
+
+# ──────────────────────────────
+# MAIN
+# ──────────────────────────────
+def main():
+    parser = argparse.ArgumentParser(description="Strategy threshold sweep")
+    parser.add_argument("--symbol", default=DEFAULT_SYMBOL)
+    parser.add_argument("--param", action="append", default=[],
+                        help="name=a,b,c or name=start:stop:step (repeatable)")
+    parser.add_argument("--samples", type=int, help="random sample of the grid")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=SWEEP_WORKERS)
+    parser.add_argument("--rank", default=RANK_BY)
+    parser.add_argument("--min-trades", type=int, default=MIN_TRADES)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--csv", help="write the full ranked table here")
+    args = parser.parse_args()
+
+    axes   = dict(parse_axis(spec) for spec in args.param) or DEFAULT_GRID
+    combos = build_grid(axes, args.samples, args.seed)
+    print(f"[INFO] Sweeping {len(combos)} combinations of "
+          f"{', '.join(axes)} on {args.workers} workers...")
+
+    prepared = prepare_frames(args.symbol, fetch_history([args.symbol]))
+    if prepared is None:
+        return
+    df_1h, df_1d, df_1w, _ = prepared
+
+    ranked = rank(run_sweep(df_1h, df_1d, df_1w, combos, args.symbol, args.workers),
+                  args.rank, args.min_trades)
+    columns = list(axes) + [c for c in ("total_trades", "win_rate", "profit_factor",
+                                        "total_pnl", "return_pct", "max_drawdown")
+                            if c in ranked]
+    print(ranked[columns].head(args.top).to_string())
+    if args.csv:
+        ranked.to_csv(args.csv, index_label="rank")
+        print(f"[INFO] Results written to {args.csv}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+SWING_MIN_LOW   = 100    # drops zero / bad-tick lows
+SWING_MIN_RANGE = 1.0    # drops flat candles (< $1 range)
+
+def swing_stats(df: pd.DataFrame, lookback: int = 20,
+                min_low: float = SWING_MIN_LOW,
+                min_range: float = SWING_MIN_RANGE) -> pd.DataFrame:
+    """
+    Rolling swing high / swing low / average candle range over the
+    last `lookback` bars, ignoring zero lows and flat candles.
+    Does NOT affect indicator calculations.
+    One row per bar; NaN where every bar in the window was filtered.
+    """
+    rng  = df["high"] - df["low"]
+    keep = (df["low"] > min_low) & (rng >= min_range)
+
+    def roll(s: pd.Series):
+        return s.where(keep).rolling(lookback, min_periods=1)
+
+    return pd.DataFrame({
+        "swing_high":  roll(df["high"]).max(),
+        "swing_low":   roll(df["low"]).min(),
+        "swing_range": roll(rng).mean(),
+    }, index=df.index)
+
+def swing_distance_ok(price, atr_val, swing: pd.DataFrame | tuple,
+                      direction: str):
+    """
+    Price must be at least 2x average candle range away from the
+    swing high/low. Prevents entries at support/resistance walls.
+    Works on scalars or whole columns; False where no swing exists.
+    """
+    swing_high, swing_low, swing_range = (
+        (swing["swing_high"], swing["swing_low"], swing["swing_range"])
+        if isinstance(swing, pd.DataFrame) else swing
+    )
+    swing_high = np.asarray(swing_high, dtype=float)
+    avg_range  = np.maximum(np.asarray(swing_range, dtype=float), atr_val * 1.0)
+    if direction == "SELL":
+        away = price > np.asarray(swing_low, dtype=float) + (avg_range * 2)
+    else:
+        away = price < swing_high - (avg_range * 2)
+    return ~np.isnan(swing_high) & away
@@ -0,0 +1,114 @@
+import os
+import json
+import time
+import resource
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+TELEMETRY_LOG = os.getenv("TELEMETRY_LOG")     # also append JSON lines here
+PROFILE       = os.getenv("PROFILE")           # cProfile dump path, e.g. run.prof
+
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def rss_mb() -> float:
+    """Current resident set size (peak RSS where /proc is missing)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE / 2 ** 20
+    except OSError:
+        return peak_rss_mb()
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if os.uname().sysname == "Darwin" else peak / 1024
+
+class Run:
+    """
+    Spans and counters for one run, safe to update from worker
+    threads. emit() writes them as a single JSON line.
+    """
+
+    def __init__(self, name: str):
+        self.name     = name
+        self.started  = datetime.now(timezone.utc)
+        self.t0       = time.perf_counter()
+        self.spans    = []
+        self.counters = {}
+        self._lock    = threading.Lock()
+
+    @contextmanager
+    def span(self, stage: str, symbol: str | None = None):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = {"stage": stage, "wall_s": round(time.perf_counter() - t0, 4),
+                      "rss_mb": round(rss_mb(), 1)}
+            if symbol:
+                record["symbol"] = symbol
+            with self._lock:
+                self.spans.append(record)
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                "run":         self.name,
+                "started":     self.started.isoformat(timespec="seconds"),
+                "wall_s":      round(time.perf_counter() - self.t0, 4),
+                "peak_rss_mb": round(peak_rss_mb(), 1),
+                "spans":       list(self.spans),
+                "counters":    dict(sorted(self.counters.items())),
+            }
+
+    def emit(self):
+        line = json.dumps(self.summary(), default=str)
+        print(f"[TELEMETRY] {line}")
+        if TELEMETRY_LOG:
+            os.makedirs(os.path.dirname(TELEMETRY_LOG) or ".", exist_ok=True)
+            with open(TELEMETRY_LOG, "a") as f:
+                f.write(line + "\n")
+
+_run: Run | None = None
+
+@contextmanager
+def instrumented(name: str, profile: str | None = PROFILE):
+    """
+    Scope of one run: spans and counters recorded inside land in
+    one JSON line on exit. With `profile` (PROFILE env) the run is
+    also under cProfile and the stats are dumped to that path.
+    """
+    global _run
+    outer, _run = _run, Run(name)
+    profiler = None
+    if profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        yield _run
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(profile)
+            print(f"[INFO] Profile written to {profile}")
+        _run.emit()
+        _run = outer
+
+@contextmanager
+def span(stage: str, symbol: str | None = None):
+    """Times a stage of the current run; a no-op outside instrumented()."""
+    if _run is None:
+        yield
+        return
+    with _run.span(stage, symbol):
+        yield
+
+def count(name: str, n: int = 1):
+    """Adds to a counter of the current run (HTTP calls, cache hits, ...)."""
+    if _run is not None:
+        _run.count(name, n)
@@ -0,0 +1,174 @@
+import os
+from dataclasses import replace
+from datetime import datetime
+import pandas as pd
+from helpers import send_alert, flush_alerts
+from backtest import (fetch_history, prepare_frames, simulate_trades, calc_stats,
+                      INITIAL_EQUITY, WAT, SWING_WINDOW)
+from strategy import Params, BB_PERIOD, signal_context
+from instruments import SYMBOLS, DEFAULT_SYMBOL, get_instrument
+from ledger import TradeLedger
+from sweep import DEFAULT_GRID, RANK_BY, MIN_TRADES, SWEEP_WORKERS, \
+                  build_grid, evaluate_many, rank
+from telemetry import instrumented, span
+
+# ──────────────────────────────
+# CONFIG
+# ──────────────────────────────
+WF_IN_SAMPLE     = int(os.getenv("WF_IN_SAMPLE", "480"))     # 1h bars optimised on
+WF_OUT_SAMPLE    = int(os.getenv("WF_OUT_SAMPLE", "120"))    # 1h bars traded after
+WF_LOOKBACK_DAYS = int(os.getenv("WF_LOOKBACK_DAYS", "365"))
+WF_SAMPLES       = int(os.getenv("WF_SAMPLES", "0")) or None # random grid subset
+WF_HISTORY       = (("1h", 5000), ("1day", 500), ("1week", 120))
+
+# ──────────────────────────────
+# FOLDS
+# ──────────────────────────────
+def make_folds(n_bars: int, in_sample: int = WF_IN_SAMPLE,
+               out_sample: int = WF_OUT_SAMPLE,
+               first: int = BB_PERIOD + 1) -> list[tuple[int, int, int]]:
+    """
+    Rolling (is_start, is_stop, oos_stop) bar ranges: optimise on
+    [is_start, is_stop), trade [is_stop, oos_stop). Each fold steps
+    forward by out_sample, so the out-of-sample windows tile history.
+    """
+    folds = []
+    start = first
+    while start + in_sample + out_sample <= n_bars:
+        folds.append((start, start + in_sample, start + in_sample + out_sample))
+        start += out_sample
+    return folds
+
+# ──────────────────────────────
+# WALK-FORWARD
+# ──────────────────────────────
+def walk_forward(df_1h: pd.DataFrame, df_1d: pd.DataFrame, df_1w: pd.DataFrame,
+                 combos: list[dict], symbol: str = DEFAULT_SYMBOL,
+                 in_sample: int = WF_IN_SAMPLE, out_sample: int = WF_OUT_SAMPLE,
+                 rank_by: str = RANK_BY, min_trades: int = MIN_TRADES,
+                 workers: int = SWEEP_WORKERS) -> tuple[pd.DataFrame, TradeLedger]:
+    """
+    Optimises combos on every in-sample window, then trades the
+    winner on the out-of-sample window that follows it.
+    Indicators and the signal_context are computed once over the
+    whole history and shared by every window, so each fold × combo
+    task only evaluates the Params rules on its own bars; all of
+    them go through one process pool.
+    Out-of-sample runs are chained in order as one account: each
+    fold starts from the previous fold's equity and SL zones, a
+    trade still open at a fold's end runs to its real exit, and the
+    next fold only enters after that exit. Returns (fold table,
+    stitched trades).
+    """
+    instrument = get_instrument(symbol)
+    base       = Params.for_instrument(instrument)
+    folds      = make_folds(len(df_1h), in_sample, out_sample)
+    if not folds:
+        return pd.DataFrame(), TradeLedger()
+    tasks      = [(combo, is_start, is_stop)
+                  for is_start, is_stop, _ in folds for combo in combos]
+    context    = signal_context(df_1h, df_1d, df_1w, SWING_WINDOW, instrument=instrument)
+    results    = evaluate_many(df_1h, df_1d, df_1w, tasks, symbol, workers, context)
+
+    rows, stitched = [], []
+    equity = INITIAL_EQUITY
+    zones  = []       # SL zones, carried across folds
+    resume = 0        # first bar after the previous fold's last exit
+    for k, (is_start, is_stop, oos_stop) in enumerate(folds):
+        ranked = rank(pd.DataFrame(results[k * len(combos):(k + 1) * len(combos)]),
+                      rank_by, min_trades)
+        best   = ranked.iloc[0] if "total_trades" in ranked else None
+        combo  = {name: best[name] for name in combos[0]} if best is not None else {}
+
+        trades = simulate_trades(df_1h, df_1d, df_1w, instrument=instrument,
+                                 params=replace(base, **combo),
+                                 start=max(is_stop, resume), stop=oos_stop,
+                                 initial_equity=equity, run_out=True, sl_zones=zones,
+                                 context=context)
+        closed = trades.closed()
+        start_equity = equity
+        if len(closed):
+            equity = float(closed["equity"][-1])
+            last   = pd.Timestamp(closed["exit_time"][-1], tz="UTC")
+            resume = int(df_1h["datetime"].searchsorted(last)) + 1
+        if len(closed) < len(trades):
+            resume = len(df_1h)       # still open when the data ends
+        stitched.append(closed)
+
+        rows.append({
+            "fold":        k + 1,
+            "oos_from":    df_1h["datetime"].iat[is_stop],
+            "oos_to":      df_1h["datetime"].iat[oos_stop - 1],
+            **combo,
+            "is_trades":   best["total_trades"] if best is not None else 0,
+            "is_pf":       best["profit_factor"] if best is not None else None,
+            "is_return":   best["return_pct"] if best is not None else None,
+            "oos_trades":  len(closed),
+            "oos_return":  round((equity - start_equity) / start_equity * 100, 2),
+            "equity":      equity,
+        })
+    return pd.DataFrame(rows), TradeLedger.concat(stitched)
+
+def build_wf_report(folds: pd.DataFrame, stats: dict, symbol: str) -> str:
+    now = datetime.now(WAT).strftime("%Y-%m-%d %H:%M")
+    if not stats:
+        return (
+            f"📉 <b>{symbol} Walk-Forward</b>\n"
+            f"No out-of-sample trades across {len(folds)} folds.\n"
+            f"Run: {now} WAT"
+        )
+    positive = int((folds["oos_return"] > 0).sum())
+    return (
+        f"🧪 <b>{symbol} Walk-Forward — {len(folds)} folds</b>\n"
+        f"━━━━━━━━━━━━━━━━━━━━━\n"
+        f"Window         : {WF_IN_SAMPLE}h in / {WF_OUT_SAMPLE}h out\n"
+        f"Positive Folds : {positive}/{len(folds)}\n"
+        f"━━━━━━━━━━━━━━━━━━━━━\n"
+        f"OOS Trades     : {stats['total_trades']} "
+        f"(✅{stats['wins']} ❌{stats['losses']})\n"
+        f"OOS Win Rate   : {stats['win_rate']}%\n"
+        f"OOS PF         : {stats['profit_factor']}\n"
+        f"OOS Return     : {stats['return_pct']:+.2f}%\n"
+        f"Max Drawdown   : {stats['max_drawdown']}%\n"
+        f"Final Equity   : ${stats['final_equity']:,.2f}\n"
+        f"━━━━━━━━━━━━━━━━━━━━━\n"
+        f"Run            : {now} WAT"
+    )
+
+# ──────────────────────────────
+# MAIN
+# ──────────────────────────────
+def main():
+    with instrumented("walkforward"):
+        print("[INFO] Starting walk-forward backtest...")
+        combos = build_grid(DEFAULT_GRID, WF_SAMPLES)
+        with span("fetch"):
+            frames = fetch_history(SYMBOLS, WF_HISTORY)
+
+        for symbol in SYMBOLS:
+            with span("prepare", symbol):
+                prepared = prepare_frames(symbol, frames, WF_LOOKBACK_DAYS)
+            if prepared is None:
+                continue
+            df_1h, df_1d, df_1w, _ = prepared
+
+            print(f"[INFO] {len(combos)} combinations × "
+                  f"{len(make_folds(len(df_1h)))} folds on {SWEEP_WORKERS} workers...")
+            with span("walk_forward", symbol):
+                folds, trades = walk_forward(df_1h, df_1d, df_1w, combos, symbol)
+            if folds.empty:
+                print(f"[WARN] Not enough bars ({len(df_1h)}) for one fold of {symbol}")
+                continue
+            print(folds.to_string(index=False))
+
+            with span("report", symbol):
+                report = build_wf_report(folds, calc_stats(trades, INITIAL_EQUITY), symbol)
+            print(report)
+            with span("alert", symbol):
+                send_alert(report)
+
+        with span("deliver"):
+            flush_alerts(timeout=60)
+
+if __name__ == "__main__":
+    main()